@@ -1,36 +1,304 @@
 """
 LLM agent for dataset search and analysis.
 """
+import re
 import time
-from typing import Dict, List, Any, Optional, Tuple, Union
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import heapq
+import functools
+import logging
+import hashlib
+import atexit
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, Union, AsyncIterator, Coroutine, Iterator, TypeVar
+import httpx
 import openai
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage
 
 from .prompts import PromptTemplates
 from .processors import ResponseProcessor
-from data_sources import get_connector, DatasetInfo
-from utils import config, cache
+from data_sources import get_connector, DatasetInfo, CONNECTORS
+from utils import config, cache, LLMConfig
+from utils.cache import normalize_prompt
 from utils.logger import setup_logger
 
+T = TypeVar("T")
+
+# Connector names a data source can resolve to
+_ALLOWED = frozenset(("kaggle", "huggingface", "google_dataset"))
+_CONNECTOR_RE = re.compile("|".join(sorted(_ALLOWED)), re.IGNORECASE)
+
+def _flatten(items: Any) -> Iterator[Any]:
+    """Flatten arbitrarily nested lists and tuples into their leaf items."""
+    for item in items:
+        if isinstance(item, (list, tuple)):
+            yield from _flatten(item)
+        else:
+            yield item
+
+def _canonicalize(sources: Any) -> Iterator[Optional[str]]:
+    """
+    Map data sources to connector names.
+    
+    Args:
+        sources: A data source, or a (possibly nested) list of data sources. Sources may be
+            LLM output such as "['kaggle']" or "kaggle as per user's preference".
+            
+    Yields:
+        Optional[str]: Connector name for each source, or None if it matches no connector.
+    """
+    if not isinstance(sources, (list, tuple)):
+        sources = [sources]
+    for source in _flatten(sources):
+        yield _canonicalize_one(str(source))
+
+@functools.lru_cache(maxsize=1024)
+def _canonicalize_one(source: str) -> Optional[str]:
+    """
+    Map a single data source string to a connector name.
+    
+    Args:
+        source: Data source string.
+        
+    Returns:
+        Optional[str]: Connector name, or None if it matches no connector.
+    """
+    if source in _ALLOWED:
+        return source
+    match = _CONNECTOR_RE.search(source)
+    return match.group(0).lower() if match else None
+
+def _search_terms_cache_input(kind: str, query: str, context: Optional[Dict[str, Any]]) -> str:
+    """
+    Build the text the search terms response cache is keyed on.
+    
+    The key is the request rather than the rendered prompt, so prompt changes do not
+    invalidate it. The query is typed by the user, so it is normalized and queries
+    differing only in case or whitespace share a response.
+    
+    Args:
+        kind: Kind of search terms prompt.
+        query: User query.
+        context: Additional context.
+        
+    Returns:
+        str: Cache input.
+    """
+    return f"{kind}:{(normalize_prompt(query), sorted((context or {}).items()))!r}"
+
+def _relevance_score(dataset: DatasetInfo, terms: List[str]) -> int:
+    """
+    Score a dataset by how many search terms appear in its name or description.
+    
+    Args:
+        dataset: Dataset to score.
+        terms: Lowercased search terms.
+        
+    Returns:
+        int: Number of matching terms.
+    """
+    text = f"{dataset.name} {dataset.description}".lower()
+    return sum(term in text for term in terms)
+
+def _normalize_sources(sources: Any) -> List[str]:
+    """
+    Map raw data sources to a list of unique connector names.
+    
+    Args:
+        sources: Data sources from the user or the LLM, possibly nested or decorated.
+        
+    Returns:
+        List[str]: Connector names in their original order, without duplicates.
+    """
+    return list(dict.fromkeys(filter(None, _canonicalize(sources))))
+
+def _user_data_sources(context: Optional[Dict[str, Any]]) -> Optional[Any]:
+    """
+    Get the data sources the user selected, if any.
+    
+    Args:
+        context: Additional context.
+        
+    Returns:
+        Optional[Any]: The ``user_preferences.data_sources`` value, or None if absent.
+    """
+    return (context or {}).get("user_preferences", {}).get("data_sources")
+
 class LLMAgent:
     """LLM agent for dataset search and analysis."""
     
-    def __init__(self):
-        """Initialize the LLM agent."""
-        self.logger = setup_logger("llm_agent")
+    # Maximum number of datasets included in the analysis prompt
+    MAX_ANALYSIS_DATASETS = 10
+    
+    # Maximum number of concurrent searches per connector, to stay under API rate limits
+    SOURCE_CONCURRENCY = {"kaggle": 4, "huggingface": 8, "google_dataset": 2}
+    DEFAULT_SOURCE_CONCURRENCY = 4
+    
+    # Seconds to wait for a search, or for each event of a streamed search, before giving up
+    RUN_TIMEOUT = 300
+    
+    # Seconds LLM responses are cached. Responses sampled at a nonzero temperature are
+    # reused too, so a repeated request gets the same answer until it expires
+    LLM_CACHE_TTL = 24 * 60 * 60
+    
+    def __init__(self, llm_config: Optional[LLMConfig] = None):
+        """
+        Initialize the LLM agent.
         
-        # Set up OpenAI client
-        openai.api_key = config.OPENAI_API_KEY
+        Args:
+            llm_config: LLM configuration, including the OpenAI API key. Defaults to the
+                application config.
+        """
+        self.logger = setup_logger("llm_agent")
         
-        # Set up LangChain models
-        self.llm_config = config.get_llm_config()
-        self.chat_model = ChatOpenAI(
-            model_name=self.llm_config["model"],
-            temperature=self.llm_config["temperature"],
-            api_key=self.llm_config["api_key"],
+        # Set up the async OpenAI client. Its connection pool is reused by every call
+        # made from the agent's event loop, so concurrent requests share connections.
+        self.llm_config: LLMConfig = llm_config or config.get_llm_config()
+        self._client = openai.AsyncOpenAI(
+            api_key=self.llm_config.api_key,
+            http_client=httpx.AsyncClient(limits=httpx.Limits(max_connections=64)),
         )
+        
+        # Event loop that drives the async search pipeline. It is started lazily and
+        # kept alive for the lifetime of the agent so the async HTTP clients can keep
+        # their connection pools between searches.
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self._closed = False
+        
+        # Searches in progress. Closing the agent waits for them, since the agent is
+        # shared and other sessions may still be using it
+        self._active = 0
+        self._closing = False
+        
+        # Long-lived worker pools, so threads stay warm between searches. Term searches
+        # get their own pool so they cannot starve other blocking work on the loop.
+        max_workers = config.MAX_SEARCH_WORKERS or 16
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-search")
+        self._term_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-search-term")
+        atexit.register(self.close)
+        
+        # Per-connector limits shared by every search made through this agent. They are
+        # only awaited on the agent's event loop.
+        self._source_limits: Dict[str, asyncio.Semaphore] = {}
+    
+    def close(self) -> None:
+        """
+        Close the OpenAI client and shut down the agent's event loop and worker pools.
+        
+        Searches still in progress are allowed to finish first; the agent is shut down
+        when the last of them returns. No new searches can be started once closed.
+        """
+        with self._loop_lock:
+            if self._closing:
+                return
+            self._closing = True
+            if self._active:
+                return
+        self._shutdown()
+    
+    def _shutdown(self) -> None:
+        """Shut the agent down, once no searches are in progress."""
+        with self._loop_lock:
+            if self._closed:
+                return
+            self._closed = True
+            loop, self._loop = self._loop, None
+        
+        # The client's connections belong to the loop, so close it there before stopping it
+        if loop is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._aclose_loop(), loop).result(timeout=5)
+            except Exception as e:
+                self.logger.warning("Error closing OpenAI client: %s", e)
+            loop.call_soon_threadsafe(loop.stop)
+        
+        self._pool.shutdown(wait=False)
+        self._term_pool.shutdown(wait=False)
+        
+        # Nothing is left to clean up at exit, so let the agent be garbage collected
+        atexit.unregister(self.close)
+    
+    async def _aclose_loop(self) -> None:
+        """Cancel the tasks left on the agent's event loop and close the OpenAI client."""
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._client.close()
+    
+    def _acquire(self) -> asyncio.AbstractEventLoop:
+        """
+        Register a search in progress and get the agent's event loop, starting it on a
+        background thread if needed. Each call must be paired with one to _release.
+        
+        Returns:
+            asyncio.AbstractEventLoop: Running event loop.
+            
+        Raises:
+            RuntimeError: If the agent has been closed.
+        """
+        with self._loop_lock:
+            if self._closing:
+                raise RuntimeError("LLM agent is closed")
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                # asyncio.to_thread runs on the default executor, so route it to the shared pool
+                loop.set_default_executor(self._pool)
+                thread = threading.Thread(target=loop.run_forever, name="llm-agent-loop", daemon=True)
+                thread.start()
+                self._loop = loop
+            self._active += 1
+            return self._loop
+    
+    def _release(self) -> None:
+        """Unregister a search in progress, finishing a pending close after the last one."""
+        with self._loop_lock:
+            self._active -= 1
+            shutdown = self._closing and not self._active
+        if shutdown:
+            self._shutdown()
+    
+    def _result(self, coro: Coroutine[Any, Any, T], loop: asyncio.AbstractEventLoop) -> T:
+        """
+        Run a coroutine on the agent's event loop and wait for its result.
+        
+        Args:
+            coro: Coroutine to run.
+            loop: The agent's event loop.
+            
+        Returns:
+            The result of the coroutine.
+            
+        Raises:
+            TimeoutError: If the coroutine takes longer than RUN_TIMEOUT; it is cancelled.
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout=self.RUN_TIMEOUT)
+        except TimeoutError:
+            future.cancel()
+            raise
+    
+    def _run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """
+        Run a coroutine on the agent's event loop and wait for its result.
+        
+        Args:
+            coro: Coroutine to run.
+            
+        Returns:
+            The result of the coroutine.
+        """
+        try:
+            loop = self._acquire()
+        except RuntimeError:
+            coro.close()
+            raise
+        try:
+            return self._result(coro, loop)
+        finally:
+            self._release()
     
     def search_datasets(self, query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
@@ -43,54 +311,269 @@ class LLMAgent:
         Returns:
             Dict[str, Any]: Search results.
         """
-        self.logger.info(f"Searching datasets for query: {query}")
+        return self._run(self._asearch_datasets(query, context))
+    
+    async def _asearch_datasets(self, query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Search for datasets based on a user query.
+        
+        Args:
+            query: User query.
+            context: Additional context.
+            
+        Returns:
+            Dict[str, Any]: Search results.
+        """
+        self.logger.info("Searching datasets for query: %s", query)
+        search_terms, data_sources, explanation = await self._aplan_search(query, context)
+        
+        # Collect datasets as each source finishes, and start the analysis on the most
+        # relevant ones as soon as enough have arrived so the LLM call overlaps with
+        # slower sources
+        all_datasets = []
+        analysis_task = None
+        async for datasets in self._aiter_source_results(search_terms, data_sources):
+            all_datasets.extend(datasets)
+            if analysis_task is None and len(all_datasets) >= self.MAX_ANALYSIS_DATASETS:
+                analysis_task = asyncio.create_task(
+                    self._aanalyze_datasets(query, list(all_datasets), search_terms)
+                )
+        
+        # Analyze datasets using LLM
+        if analysis_task is None:
+            analysis = await self._aanalyze_datasets(query, all_datasets, search_terms)
+        else:
+            analysis = await analysis_task
+        
+        return {
+            "query": query,
+            "search_terms": search_terms,
+            "data_sources": data_sources,
+            "explanation": explanation,
+            # Convert to dictionaries only for the response
+            "datasets": [dataset.to_dict() for dataset in all_datasets],
+            "analysis": analysis,
+        }
+    
+    def search_datasets_stream(self, query: str, context: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Search for datasets based on a user query, yielding results as they become available.
         
+        The generator yields, in order, a ``terms`` event, one ``datasets`` event per source,
+        ``analysis_token`` events as the analysis streams in, and a final ``analysis`` event.
+        
+        Args:
+            query: User query.
+            context: Additional context.
+            
+        Yields:
+            Dict[str, Any]: Search events, each with a ``stage`` key.
+        """
+        loop = self._acquire()
+        agen = self._asearch_datasets_stream(query, context)
+        try:
+            while True:
+                try:
+                    yield self._result(agen.__anext__(), loop)
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Close the async generator if the consumer stops early. After a timeout the
+            # cancelled step may still be unwinding, in which case it closes the generator
+            try:
+                self._result(agen.aclose(), loop)
+            except RuntimeError as e:
+                self.logger.debug("Search stream not closed: %s", e)
+            finally:
+                self._release()
+    
+    async def _asearch_datasets_stream(self, query: str, context: Dict[str, Any] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Search for datasets based on a user query, yielding results as they become available.
+        
+        Args:
+            query: User query.
+            context: Additional context.
+            
+        Yields:
+            Dict[str, Any]: Search events, each with a ``stage`` key.
+        """
+        self.logger.info("Streaming dataset search for query: %s", query)
+        search_terms, data_sources, explanation, term_searches = await self._astream_plan_search(query, context)
+        yield {
+            "stage": "terms",
+            "query": query,
+            "search_terms": search_terms,
+            "data_sources": data_sources,
+            "explanation": explanation,
+        }
+        
+        all_datasets = []
+        try:
+            async for datasets in self._aiter_term_searches(search_terms, data_sources, term_searches):
+                all_datasets.extend(datasets)
+                yield {"stage": "datasets", "datasets": [dataset.to_dict() for dataset in datasets]}
+        finally:
+            # Stop any searches still running if the consumer stopped early
+            for task in term_searches.values():
+                task.cancel()
+        
+        # Nothing to analyze, so skip the LLM round-trip
+        if not all_datasets:
+            yield {"stage": "analysis", "analysis": ResponseProcessor.process_dataset_analysis("")}
+            return
+        
+        # Stream the analysis and parse it once complete
+        prompt = PromptTemplates.dataset_analysis_prompt(query, self._select_for_analysis(all_datasets, search_terms))
+        chunks = []
+        async for text in self._astream_llm(prompt):
+            chunks.append(text)
+            yield {"stage": "analysis_token", "text": text}
+        yield {"stage": "analysis", "analysis": ResponseProcessor.process_dataset_analysis("".join(chunks))}
+    
+    async def _aplan_search(self, query: str, context: Dict[str, Any] = None) -> Tuple[Tuple[str, ...], List[str], str]:
+        """
+        Generate search terms and decide which data sources to search.
+        
+        Args:
+            query: User query.
+            context: Additional context.
+            
+        Returns:
+            Tuple[Tuple[str, ...], List[str], str]: Search terms, connector names, and explanation.
+        """
         # Check if user has specified data sources in the context
-        user_data_sources = None
-        if context and "user_preferences" in context and "data_sources" in context["user_preferences"]:
-            user_data_sources = context["user_preferences"]["data_sources"]
-            self.logger.info(f"User specified data sources: {user_data_sources}")
+        user_data_sources = _user_data_sources(context)
+        if user_data_sources is not None:
+            self.logger.info("User specified data sources: %s", user_data_sources)
         
         # Generate search terms using LLM
-        search_terms, llm_data_sources, explanation = self._generate_search_terms(query, context)
+        search_terms, llm_data_sources, explanation = await self._agenerate_search_terms(query, context, user_data_sources)
         
         # ALWAYS use user-specified data sources if available, and IGNORE LLM-suggested ones
         if user_data_sources:
             data_sources = user_data_sources
-            self.logger.info(f"Using ONLY user-specified data sources: {data_sources}")
+            self.logger.info("Using ONLY user-specified data sources: %s", data_sources)
         else:
             data_sources = llm_data_sources
-            self.logger.info(f"No user preferences found, using LLM-suggested data sources: {data_sources}")
+            self.logger.info("No user preferences found, using LLM-suggested data sources: %s", data_sources)
+        
+        # Map the sources to connector names once; everything below takes canonical names
+        data_sources = _normalize_sources(data_sources)
         
         # If no data sources specified, use all available
         if not data_sources:
-            from data_sources import CONNECTORS
             data_sources = list(CONNECTORS.keys())
-            self.logger.info(f"No data sources specified, using all available: {data_sources}")
+            self.logger.info("No data sources specified, using all available: %s", data_sources)
         
-        # Search datasets from multiple sources in parallel
-        # STRICTLY use only user-specified data sources if available
+        return search_terms, data_sources, explanation
+    
+    async def _astream_plan_search(
+        self, query: str, context: Dict[str, Any] = None
+    ) -> Tuple[Tuple[str, ...], List[str], str, Dict[Tuple[str, str], "asyncio.Task[List[DatasetInfo]]"]]:
+        """
+        Generate search terms from a streamed LLM response, starting searches as terms arrive.
+        
+        When the user has chosen the data sources, each search term is searched on every
+        source as soon as the LLM finishes writing it, so searching overlaps with the rest
+        of the response. Otherwise the searches start once the data sources are known.
+        
+        Args:
+            query: User query.
+            context: Additional context.
+            
+        Returns:
+            Tuple[Tuple[str, ...], List[str], str, Dict[Tuple[str, str], asyncio.Task]]: Search
+                terms, connector names, explanation, and the search task for each
+                ``(source, term)`` pair.
+        """
+        user_data_sources = _user_data_sources(context)
+        if user_data_sources is not None:
+            self.logger.info("User specified data sources: %s", user_data_sources)
+        
+        # Same prompt and cache key as _agenerate_search_terms
         if user_data_sources:
-            self.logger.info(f"Strictly using ONLY user-specified data sources: {user_data_sources}")
-            search_sources = user_data_sources
-            # Update data_sources to reflect what was actually used
-            data_sources = user_data_sources
+            prompt = PromptTemplates.dataset_search_prompt_terms_only(query, context, user_data_sources)
+            kind = "search_terms_only"
         else:
-            search_sources = data_sources
-            
-        all_datasets = self._search_multiple_sources(search_terms, search_sources)
+            prompt = PromptTemplates.dataset_search_prompt(query, context)
+            kind = "search_terms"
+        chunks = self._astream_llm(prompt, cache_input=_search_terms_cache_input(kind, query, context))
         
-        # Analyze datasets using LLM
-        analysis = self._analyze_datasets(query, all_datasets)
+        early_sources = _normalize_sources(user_data_sources) if user_data_sources else []
+        term_searches: Dict[Tuple[str, str], asyncio.Task] = {}
         
-        return {
-            "query": query,
-            "search_terms": search_terms,
-            "data_sources": data_sources,
-            "explanation": explanation,
-            "datasets": all_datasets,
-            "analysis": analysis,
-        }
+        def start(sources: List[str], term: str) -> None:
+            for source in sources:
+                if (source, term) not in term_searches:
+                    term_searches[source, term] = asyncio.create_task(self._asearch_source(source, [term]))
+        
+        try:
+            async for event, value in ResponseProcessor.process_search_terms_stream(chunks):
+                if event == "search_terms":
+                    start(early_sources, value)
+                elif event == "result":
+                    search_terms, llm_data_sources, explanation = value
+        except BaseException:
+            for task in term_searches.values():
+                task.cancel()
+            raise
+        
+        self.logger.info("Generated search terms: %s", search_terms)
+        if user_data_sources:
+            data_sources = early_sources
+            self.logger.info("Using ONLY user-specified data sources: %s", data_sources)
+        else:
+            data_sources = _normalize_sources(llm_data_sources)
+            self.logger.info("No user preferences found, using LLM-suggested data sources: %s", data_sources)
+        
+        # If no data sources specified, use all available
+        if not data_sources:
+            data_sources = list(CONNECTORS.keys())
+            self.logger.info("No data sources specified, using all available: %s", data_sources)
+        
+        # Start whatever the stream could not: terms outside quoted lists, or all of them
+        # when the sources came from the LLM. Searches for streamed terms that did not
+        # make it into the final parse are dropped.
+        wanted = {(source, term) for source in data_sources for term in search_terms}
+        for key in [key for key in term_searches if key not in wanted]:
+            term_searches.pop(key).cancel()
+        for term in search_terms:
+            start(data_sources, term)
+        
+        return search_terms, data_sources, explanation, term_searches
+    
+    async def _aiter_term_searches(
+        self,
+        search_terms: List[str],
+        data_sources: List[str],
+        term_searches: Dict[Tuple[str, str], "asyncio.Task[List[DatasetInfo]]"],
+    ) -> AsyncIterator[List[DatasetInfo]]:
+        """
+        Collect already started term searches, yielding each source's results as soon as it finishes.
+        
+        Args:
+            search_terms: List of search terms.
+            data_sources: Connector names, as returned by _normalize_sources.
+            term_searches: Search task for each ``(source, term)`` pair.
+            
+        Yields:
+            List[DatasetInfo]: Datasets found in one source.
+        """
+        async def collect(source: str) -> Tuple[str, List[DatasetInfo]]:
+            term_results = await asyncio.gather(*(term_searches[source, term] for term in search_terms))
+            
+            # Remove duplicates, keeping the first hit in term order
+            unique_results = {}
+            for results in term_results:
+                for dataset in results:
+                    unique_results.setdefault(dataset.id, dataset)
+            return source, list(unique_results.values())
+        
+        for future in asyncio.as_completed([collect(source) for source in data_sources]):
+            source, datasets = await future
+            self.logger.info("Found %d datasets from %s", len(datasets), source)
+            yield datasets
     
     def get_dataset_recommendation(self, query: str, datasets: List[Dict[str, Any]]) -> str:
         """
@@ -103,20 +586,20 @@ class LLMAgent:
         Returns:
             str: Recommendation.
         """
-        self.logger.info(f"Getting dataset recommendation for query: {query}")
+        self.logger.info("Getting dataset recommendation for query: %s", query)
         
         # Generate prompt
         prompt = PromptTemplates.dataset_recommendation_prompt(query, datasets)
         
         # Get recommendation from LLM
-        response = self._call_llm(prompt)
+        response = self._run(self._acall_llm(prompt))
         
         # Process response
         recommendation = ResponseProcessor.process_dataset_recommendation(response)
         
         return recommendation
     
-    def _generate_search_terms(self, query: str, context: Dict[str, Any] = None) -> Tuple[List[str], List[str], str]:
+    def _generate_search_terms(self, query: str, context: Dict[str, Any] = None) -> Tuple[Tuple[str, ...], Tuple[str, ...], str]:
         """
         Generate search terms for a user query.
         
@@ -125,39 +608,52 @@ class LLMAgent:
             context: Additional context.
             
         Returns:
-            Tuple[List[str], List[str], str]: Search terms, data sources, and explanation.
+            Tuple[Tuple[str, ...], Tuple[str, ...], str]: Search terms, data sources, and explanation.
         """
-        # Generate prompt
-        prompt = PromptTemplates.dataset_search_prompt(query, context)
+        return self._run(self._agenerate_search_terms(query, context))
+    
+    async def _agenerate_search_terms(
+        self,
+        query: str,
+        context: Dict[str, Any] = None,
+        user_sources: Optional[List[str]] = None,
+    ) -> Tuple[Tuple[str, ...], Tuple[str, ...], str]:
+        """
+        Generate search terms for a user query.
         
-        # Get response from LLM
-        response = self._call_llm(prompt)
+        Args:
+            query: User query.
+            context: Additional context.
+            user_sources: Data sources selected by the user. When given, the LLM is only
+                asked for search terms, and the returned data sources are empty.
+            
+        Returns:
+            Tuple[Tuple[str, ...], Tuple[str, ...], str]: Search terms, data sources, and explanation.
+        """
+        # Generate prompt; skip the data source reasoning if the user already chose them
+        if user_sources:
+            prompt = PromptTemplates.dataset_search_prompt_terms_only(query, context, user_sources)
+            kind = "search_terms_only"
+        else:
+            prompt = PromptTemplates.dataset_search_prompt(query, context)
+            kind = "search_terms"
+        
+        # Get response from LLM, keyed on the request rather than the rendered prompt
+        response = await self._acall_llm(prompt, cache_input=_search_terms_cache_input(kind, query, context))
         
         # Process response
         search_terms, data_sources, explanation = ResponseProcessor.process_search_terms(response)
         
         # Log the raw types for debugging
-        self.logger.info(f"Generated search terms: {search_terms}")
-        self.logger.info(f"Recommended data sources: {data_sources}")
-        self.logger.debug(f"Search terms types: {[type(term) for term in search_terms]}")
-        self.logger.debug(f"Data sources types: {[type(source) for source in data_sources]}")
-        
-        # Ensure data_sources contains only strings, not lists
-        normalized_sources = []
-        for source in data_sources:
-            if isinstance(source, list):
-                self.logger.warning(f"Found nested list in data sources: {source}")
-                normalized_sources.extend(source)
-            else:
-                normalized_sources.append(source)
-        
-        if normalized_sources != data_sources:
-            self.logger.info(f"Normalized data sources: {normalized_sources}")
-            data_sources = normalized_sources
+        self.logger.info("Generated search terms: %s", search_terms)
+        self.logger.info("Recommended data sources: %s", data_sources)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Search terms types: %s", [type(term) for term in search_terms])
+            self.logger.debug("Data sources types: %s", [type(source) for source in data_sources])
         
         return search_terms, data_sources, explanation
     
-    def _search_multiple_sources(self, search_terms: List[str], data_sources: List[str]) -> List[Dict[str, Any]]:
+    async def _asearch_multiple_sources(self, search_terms: List[str], data_sources: List[str]) -> List[DatasetInfo]:
         """
         Search for datasets from multiple sources.
         
@@ -166,268 +662,245 @@ class LLMAgent:
             data_sources: List of data sources.
             
         Returns:
-            List[Dict[str, Any]]: List of datasets.
+            List[DatasetInfo]: List of datasets.
         """
         all_datasets = []
-        
-        # Log the input
-        self.logger.info(f"_search_multiple_sources called with data_sources: {data_sources}")
-        self.logger.info(f"data_sources type: {type(data_sources)}")
-        for i, source in enumerate(data_sources):
-            self.logger.info(f"data_source[{i}]: {source}, type: {type(source)}")
-            if isinstance(source, list):
-                for j, inner_source in enumerate(source):
-                    self.logger.info(f"data_source[{i}][{j}]: {inner_source}, type: {type(inner_source)}")
-        
-        # Ensure data_sources is a list of strings, not a list of lists
-        normalized_sources = []
-        for source in data_sources:
-            if isinstance(source, list):
-                # If it's a list, add each element individually
-                # Extract the string from the list
-                for s in source:
-                    if isinstance(s, list):
-                        self.logger.warning(f"Found nested list in data_sources: {s}")
-                        if s:
-                            normalized_sources.append(str(s[0]))
-                    else:
-                        normalized_sources.append(str(s))
-                self.logger.warning(f"Found list in data_sources: {source}, normalized to {[str(s) for s in source]}")
-            else:
-                normalized_sources.append(str(source))
-        
-        self.logger.info(f"Normalized sources: {normalized_sources}")
-        
-        # Filter out any sources that are not in the allowed list
-        allowed_sources = ["kaggle", "huggingface", "google_dataset"]
-        filtered_sources = []
-        for source in normalized_sources:
-            source_str = str(source).lower()
-            for allowed in allowed_sources:
-                if allowed in source_str:
-                    filtered_sources.append(allowed)
-                    break
-        
-        if filtered_sources != normalized_sources:
-            self.logger.info(f"Filtered sources: {filtered_sources}")
-            normalized_sources = filtered_sources
-        
-        # Create a thread pool
-        with ThreadPoolExecutor(max_workers=len(normalized_sources)) as executor:
-            # Submit search tasks
-            future_to_source = {}
-            for source in normalized_sources:
-                # Ensure source is a string
-                source_str = source
-                if isinstance(source, list):
-                    if source and len(source) > 0:
-                        if isinstance(source[0], list):
-                            if source[0] and len(source[0]) > 0:
-                                source_str = str(source[0][0])
-                            else:
-                                source_str = "kaggle"  # Default to kaggle if empty nested list
-                        else:
-                            source_str = str(source[0])
-                    else:
-                        source_str = "kaggle"  # Default to kaggle if empty list
-                    self.logger.warning(f"Source is still a list after normalization: {source}, using {source_str}")
-                else:
-                    source_str = str(source)
-                
-                # Clean up source string
-                for connector in ["kaggle", "huggingface", "google_dataset"]:
-                    if connector in source_str.lower():
-                        source_str = connector
-                        break
-                
-                self.logger.info(f"Submitting search task for source: {source_str}")
-                future = executor.submit(self._search_source, source_str, search_terms)
-                future_to_source[future] = source_str
-            
-            # Process results as they complete
-            for future in as_completed(future_to_source):
-                source = future_to_source[future]
-                try:
-                    datasets = future.result()
-                    self.logger.info(f"Found {len(datasets)} datasets from {source}")
-                    all_datasets.extend(datasets)
-                except Exception as e:
-                    self.logger.error(f"Error searching {source}: {e}")
-                    import traceback
-                    self.logger.error(f"Traceback: {traceback.format_exc()}")
+        async for datasets in self._aiter_source_results(search_terms, data_sources):
+            all_datasets.extend(datasets)
         
         return all_datasets
     
-    def _search_source(self, source: str, search_terms: List[str]) -> List[Dict[str, Any]]:
+    async def _aiter_source_results(self, search_terms: List[str], data_sources: List[str]) -> AsyncIterator[List[DatasetInfo]]:
+        """
+        Search for datasets from multiple sources, yielding each source's results as soon as it finishes.
+        
+        Args:
+            search_terms: List of search terms.
+            data_sources: Connector names, as returned by _normalize_sources.
+            
+        Yields:
+            List[DatasetInfo]: Datasets found in one source.
+        """
+        async def search(source: str) -> Tuple[str, List[DatasetInfo]]:
+            return source, await self._asearch_source(source, search_terms)
+        
+        # Process results as they complete
+        for future in asyncio.as_completed([search(source) for source in data_sources]):
+            source, datasets = await future
+            self.logger.info("Found %d datasets from %s", len(datasets), source)
+            yield datasets
+    
+    def _search_source(self, source: str, search_terms: List[str]) -> List[DatasetInfo]:
         """
         Search for datasets from a specific source.
         
         Args:
-            source: Data source.
+            source: Connector name.
             search_terms: List of search terms.
             
         Returns:
-            List[Dict[str, Any]]: List of datasets.
+            List[DatasetInfo]: List of datasets.
+        """
+        return self._run(self._asearch_source(source, search_terms))
+    
+    async def _asearch_source(self, source: str, search_terms: List[str]) -> List[DatasetInfo]:
+        """
+        Search for datasets from a specific source, searching all terms concurrently.
+        
+        Args:
+            source: Connector name.
+            search_terms: List of search terms.
+            
+        Returns:
+            List[DatasetInfo]: List of datasets.
         """
         try:
-            # Log the input type and value
-            self.logger.info(f"_search_source called with source: {source}, type: {type(source)}")
-            
-            # Get connector - ensure source is a string, not a list
-            if isinstance(source, list):
-                self.logger.warning(f"Source is a list: {source}, extracting first element: {source[0] if source else None}")
-                source = source[0] if source else ""  # Take the first element if it's a list
-                
-                # If the first element is still a list, extract from that too
-                if isinstance(source, list):
-                    self.logger.warning(f"First element is still a list: {source}, extracting from it: {source[0] if source else None}")
-                    source = source[0] if source else ""
-            
-            # Convert source to string if it's not already
-            if not isinstance(source, str):
-                self.logger.warning(f"Converting non-string source to string: {source}")
-                source = str(source)
-            
-            # Special case: if source is the string representation of a list like "['kaggle']" or '["kaggle"]'
-            if source.startswith("[") and source.endswith("]"):
-                self.logger.warning(f"Source is a string representation of a list: {source}")
-                # Try to extract the actual name
-                for connector in ["kaggle", "huggingface", "google_dataset"]:
-                    if connector in source.lower():
-                        self.logger.info(f"Extracted connector name '{connector}' from '{source}'")
-                        source = connector
-                        break
-                
-                # If we couldn't extract a connector name, try to parse the string as a list
-                if source.startswith("[") and source.endswith("]"):
-                    try:
-                        # Handle both single and double quotes
-                        if "'" in source:
-                            # Handle ['kaggle']
-                            extracted = source.replace("[", "").replace("]", "").replace("'", "").strip()
-                        elif '"' in source:
-                            # Handle ["kaggle"]
-                            extracted = source.replace("[", "").replace("]", "").replace('"', "").strip()
-                        else:
-                            # Handle [kaggle]
-                            extracted = source.replace("[", "").replace("]", "").strip()
-                        
-                        self.logger.info(f"Extracted name from string representation: {extracted}")
-                        
-                        # Check if the extracted name is a valid connector
-                        for connector in ["kaggle", "huggingface", "google_dataset"]:
-                            if connector in extracted.lower():
-                                source = connector
-                                self.logger.info(f"Matched extracted name to connector: {source}")
-                                break
-                    except Exception as e:
-                        self.logger.warning(f"Failed to parse string representation of list: {source}, error: {e}")
-            
-            # Clean up source string - remove any additional text like "as per user's preference"
-            if isinstance(source, str):
-                # Common patterns to clean up
-                original_source = source
-                source = source.split(" as per ")[0].strip()
-                source = source.split(" based on ")[0].strip()
-                source = source.split(" according to ")[0].strip()
-                source = source.split(" following ")[0].strip()
-                
-                # Remove any remaining text after the connector name
-                for connector in ["kaggle", "huggingface", "google_dataset"]:
-                    if connector in source.lower():
-                        source = connector
-                        break
-                
-                if source != original_source:
-                    self.logger.info(f"Cleaned source from '{original_source}' to '{source}'")
-            
-            # Validate that the source is one of the allowed connectors
-            allowed_connectors = ["kaggle", "huggingface", "google_dataset"]
-            if source not in allowed_connectors:
-                self.logger.warning(f"Source '{source}' is not in the allowed connectors list: {allowed_connectors}")
-                # Try to match with any of the allowed connectors
-                matched = False
-                for connector in allowed_connectors:
-                    if connector in source.lower():
-                        source = connector
-                        matched = True
-                        self.logger.info(f"Matched source to connector: {source}")
-                        break
-                
-                if not matched:
-                    self.logger.error(f"Could not match source '{source}' to any allowed connector")
-                    return []
-            
-            self.logger.info(f"Getting connector for source: {source}")
-            connector = get_connector(source)
-            
-            # Search for each term
-            all_results = []
-            for term in search_terms:
-                self.logger.info(f"Searching for term: {term} in source: {source}")
-                results = connector.search_cached(term)
-                all_results.extend(results)
-            
-            # Remove duplicates
+            if not search_terms:
+                return []
+            
+            self.logger.debug("Getting connector for source: %s", source)
+            connector = await asyncio.to_thread(get_connector, source)
+            
+            # Connectors are synchronous, so each term is searched in a worker thread
+            self.logger.info("Searching for terms: %s in source: %s", search_terms, source)
+            loop = asyncio.get_running_loop()
+            limit = self._get_source_limit(source)
+            
+            async def search_term(term: str) -> List[DatasetInfo]:
+                async with limit:
+                    return await loop.run_in_executor(self._term_pool, connector.search_cached, term)
+            
+            term_results = await asyncio.gather(*(search_term(term) for term in search_terms))
+            
+            # Remove duplicates, keeping the first hit in term order
             unique_results = {}
-            for dataset in all_results:
-                if dataset.id not in unique_results:
-                    unique_results[dataset.id] = dataset
+            for results in term_results:
+                for dataset in results:
+                    unique_results.setdefault(dataset.id, dataset)
             
-            # Convert to dictionaries
-            return [dataset.to_dict() for dataset in unique_results.values()]
-        except Exception as e:
-            self.logger.error(f"Error searching {source}: {e}")
-            import traceback
-            self.logger.error(f"Traceback: {traceback.format_exc()}")
+            return list(unique_results.values())
+        except Exception:
+            self.logger.exception("Error searching %s", source)
             return []
     
-    def _analyze_datasets(self, query: str, datasets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _get_source_limit(self, source: str) -> asyncio.Semaphore:
+        """
+        Get the semaphore limiting concurrent searches on a connector.
+        
+        Args:
+            source: Connector name.
+            
+        Returns:
+            asyncio.Semaphore: Semaphore for the connector.
+        """
+        if source not in self._source_limits:
+            limit = self.SOURCE_CONCURRENCY.get(source, self.DEFAULT_SOURCE_CONCURRENCY)
+            self._source_limits[source] = asyncio.Semaphore(limit)
+        return self._source_limits[source]
+    
+    async def _aanalyze_datasets(
+        self,
+        query: str,
+        datasets: List[DatasetInfo],
+        search_terms: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
         """
         Analyze datasets using LLM.
         
         Args:
             query: User query.
             datasets: List of datasets.
+            search_terms: Search terms used to rank datasets when there are too many to analyze.
             
         Returns:
             Dict[str, Any]: Analysis results.
         """
-        # Limit the number of datasets to analyze
-        max_datasets = 10
-        if len(datasets) > max_datasets:
-            self.logger.info(f"Limiting analysis to {max_datasets} datasets")
-            datasets = datasets[:max_datasets]
+        # Nothing to analyze, so skip the LLM round-trip
+        if not datasets:
+            self.logger.info("No datasets to analyze, skipping analysis")
+            return ResponseProcessor.process_dataset_analysis("")
         
         # Generate prompt
-        prompt = PromptTemplates.dataset_analysis_prompt(query, datasets)
+        prompt = PromptTemplates.dataset_analysis_prompt(query, self._select_for_analysis(datasets, search_terms))
         
         # Get response from LLM
-        response = self._call_llm(prompt)
+        response = await self._acall_llm(prompt)
         
         # Process response
         analysis = ResponseProcessor.process_dataset_analysis(response)
         
         return analysis
     
-    def _call_llm(self, prompt: str) -> str:
+    def _select_for_analysis(self, datasets: List[DatasetInfo], search_terms: Optional[List[str]] = None) -> List[DatasetInfo]:
         """
-        Call the LLM with a prompt.
+        Limit datasets to the most relevant ones that fit in the analysis prompt.
+        
+        Args:
+            datasets: List of datasets.
+            search_terms: Search terms used to rank the datasets.
+            
+        Returns:
+            List[DatasetInfo]: At most MAX_ANALYSIS_DATASETS datasets.
+        """
+        max_datasets = self.MAX_ANALYSIS_DATASETS
+        if len(datasets) <= max_datasets:
+            return datasets
+        
+        self.logger.info("Limiting analysis to %d datasets", max_datasets)
+        terms = [term.lower() for term in search_terms or []]
+        return heapq.nlargest(max_datasets, datasets, key=lambda dataset: _relevance_score(dataset, terms))
+    
+    def _llm_cache_key(self, cache_input: str) -> str:
+        """
+        Build the response cache key for an LLM request.
+        
+        Args:
+            cache_input: Text identifying the request, normally the prompt.
+            
+        Returns:
+            str: Cache key.
+        """
+        digest = hashlib.blake2b(cache_input.encode(), digest_size=16).hexdigest()
+        return f"llm_{digest}_{self.llm_config.model}_{self.llm_config.temperature}"
+    
+    async def _acall_llm(self, prompt: str, cache_input: Optional[str] = None) -> str:
+        """
+        Call the LLM with a prompt, reusing cached responses for identical requests.
         
         Args:
             prompt: Prompt for the LLM.
+            cache_input: Text to key the response cache on. Defaults to the prompt.
             
         Returns:
             str: LLM response.
         """
+        # Skip cache if DEBUG is True. The cache reads and writes files, so it is used
+        # from a worker thread rather than blocking the loop
+        key = None if config.DEBUG else self._llm_cache_key(cache_input or prompt)
+        if key is not None:
+            cached_content = await asyncio.to_thread(cache.get, key)
+            if cached_content is not None:
+                self.logger.info("Using cached LLM response")
+                return cached_content
+        
         try:
             # Call the LLM
-            response = self.chat_model.invoke([HumanMessage(content=prompt)])
+            response = await self._client.chat.completions.create(
+                model=self.llm_config.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=self.llm_config.temperature,
+            )
             
             # Extract content
-            content = response.content
+            content = response.choices[0].message.content or ""
+            
+            # Only cache successful responses
+            if key is not None and content:
+                await asyncio.to_thread(cache.set, key, content, self.LLM_CACHE_TTL)
             
             return content
         except Exception as e:
-            self.logger.error(f"Error calling LLM: {e}")
+            self.logger.error("Error calling LLM: %s", e)
             return ""
+    
+    async def _astream_llm(self, prompt: str, cache_input: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Call the LLM with a prompt, yielding the response as it is generated.
+        
+        Args:
+            prompt: Prompt for the LLM.
+            cache_input: Text to key the response cache on. Defaults to the prompt.
+            
+        Yields:
+            str: Pieces of the LLM response.
+        """
+        # Skip cache if DEBUG is True. The cache reads and writes files, so it is used
+        # from a worker thread rather than blocking the loop
+        key = None if config.DEBUG else self._llm_cache_key(cache_input or prompt)
+        if key is not None:
+            cached_content = await asyncio.to_thread(cache.get, key)
+            if cached_content is not None:
+                self.logger.info("Using cached LLM response")
+                yield cached_content
+                return
+        
+        chunks = []
+        try:
+            stream = await self._client.chat.completions.create(
+                model=self.llm_config.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=self.llm_config.temperature,
+                stream=True,
+            )
+            async for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    chunks.append(text)
+                    yield text
+        except Exception as e:
+            self.logger.error("Error streaming from LLM: %s", e)
+            return
+        
+        # Only cache complete responses
+        if key is not None and chunks:
+            await asyncio.to_thread(cache.set, key, "".join(chunks), self.LLM_CACHE_TTL)
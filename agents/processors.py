@@ -3,15 +3,204 @@ Response processors for the LLM agent.
 """
 import re
 import json
-import ast
-from typing import Dict, List, Any, Optional, Tuple, Set
+from typing import Dict, List, Any, Optional, Tuple, Set, AsyncIterator
 from utils.logger import setup_logger
 
+# Set up logger
+log = setup_logger("processors")
+
+# Patterns used to parse LLM responses
+_SEARCH_TERMS_RE = re.compile(r"Search Terms:\s*(.+?)(?:\n|$)", re.DOTALL)
+_DATA_SOURCES_RE = re.compile(r"Data Sources:\s*(.+?)(?:\n|$)", re.DOTALL)
+_EXPLANATION_RE = re.compile(r"Explanation:\s*(.+?)(?:\n\n|$)", re.DOTALL)
+_RANKING_RE = re.compile(r"Ranking:(.*?)(?:Detailed Analysis:|$)", re.DOTALL)
+_RANK_LINE_RE = re.compile(r"\d+\.\s*([^-]+)\s*-\s*(.+)")
+_ANALYSIS_RE = re.compile(r"Detailed Analysis:(.*?)(?:Overall Recommendation:|$)", re.DOTALL)
+_DATASET_SPLIT_RE = re.compile(r"(?:^|\n)\s*\[([^\]]+)\]:\s*\n")
+_FIELD_RE = re.compile(r"\b(Relevance|Strengths|Limitations|Recommendation):\s*([^\n]+)")
+_CONNECTORS = ("kaggle", "huggingface", "google_dataset")
+_CONNECTOR_SET = frozenset(_CONNECTORS)
+_LIST_FIELD_RE = re.compile(r"(Search Terms|Data Sources)\"?\s*:\s*\[")
+_LIST_FIELD_EVENTS = {"Search Terms": "search_terms", "Data Sources": "data_sources"}
+_CONNECTOR_RE = re.compile("|".join(_CONNECTORS), re.IGNORECASE)
+_QUALIFIER_RE = re.compile(r"\s+(?:as per|based on|according to|following)\s+")
+_OVERALL_RE = re.compile(r"Overall Recommendation:\s*(.+?)(?:\n\n|$)", re.DOTALL)
+
+# Decoder used to parse JSON embedded in a response without slicing it out first
+_DECODER = json.JSONDecoder()
+
+def _find_json_block(response: str) -> Optional[str]:
+    """
+    Find the contents of the first ```json fenced block in a response.
+    
+    Args:
+        response: LLM response.
+        
+    Returns:
+        Optional[str]: Contents of the block, or None if there is none.
+    """
+    start = response.find("```json")
+    if start < 0:
+        return None
+    start += len("```json")
+    end = response.find("```", start)
+    if end < 0:
+        return None
+    return response[start:end].strip() or None
+
+def _decode_json_object(response: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse the first JSON object embedded in a response.
+    
+    Each "{" is tried in turn, and the decoder parses from it in place, so the object is
+    located and parsed in a single pass.
+    
+    Args:
+        response: LLM response.
+        
+    Returns:
+        Optional[Dict[str, Any]]: Parsed object, or None if there is none.
+    """
+    idx = response.find("{")
+    while idx >= 0:
+        try:
+            return _DECODER.raw_decode(response, idx)[0]
+        except json.JSONDecodeError:
+            idx = response.find("{", idx + 1)
+    return None
+
+def _as_tuple(value: Any) -> Tuple[Any, ...]:
+    """Convert a parsed JSON field to a tuple, wrapping a single value."""
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    return (value,) if value else ()
+
+def _split_terms(terms_text: str) -> List[str]:
+    """Split a plain-text search terms field on commas or newlines."""
+    if "," in terms_text:
+        return [term.strip() for term in terms_text.split(",")]
+    if "\n" in terms_text:
+        return [term.strip().lstrip("- ") for term in terms_text.split("\n")]
+    return [terms_text]
+
+def _clean_source(source: str) -> str:
+    """
+    Reduce a data source to its connector name, or else drop any additional text like
+    "as per user's preference".
+    
+    Args:
+        source: Data source text.
+        
+    Returns:
+        str: Cleaned data source.
+    """
+    if source in _CONNECTOR_SET:
+        return source
+    match = _CONNECTOR_RE.search(source)
+    if match:
+        return match.group(0).lower()
+    return _QUALIFIER_RE.split(source, 1)[0].strip()
+
+class _SearchTermsParser:
+    """
+    Incremental parser for search terms responses.
+    
+    Text is fed in as it streams from the LLM, and every quoted item in the
+    ``Search Terms`` and ``Data Sources`` lists is reported as soon as its closing
+    quote arrives. Each character is scanned once, apart from a short tail kept
+    back while a field label may still be incomplete.
+    """
+    
+    # Longest text that can hold an incomplete field label
+    _LABEL_TAIL = 24
+    
+    def __init__(self):
+        """Initialize the parser."""
+        # Chunks received so far, joined only once the response is complete
+        self._chunks: List[str] = []
+        # Text not scanned yet, with _pos indexing into it
+        self._buffer = ""
+        self._pos = 0
+        self._field: Optional[str] = None
+    
+    @property
+    def text(self) -> str:
+        """
+        Get the response received so far.
+        
+        Returns:
+            str: Response text.
+        """
+        return "".join(self._chunks)
+    
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """
+        Add a piece of the response.
+        
+        Args:
+            chunk: Next piece of the LLM response.
+            
+        Returns:
+            List[Tuple[str, str]]: ``(event, value)`` pairs for list items completed
+                by this chunk, where event is ``search_terms`` or ``data_sources``.
+        """
+        self._chunks.append(chunk)
+        
+        # Keep only the unscanned tail, so the buffer does not grow with the response
+        text = self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        events = []
+        while True:
+            if self._field is None:
+                # Look for the start of the next list field
+                match = _LIST_FIELD_RE.search(text, self._pos)
+                if match is None:
+                    self._pos = max(self._pos, len(text) - self._LABEL_TAIL)
+                    return events
+                self._field = _LIST_FIELD_EVENTS[match.group(1)]
+                self._pos = match.end()
+                continue
+            
+            # Skip separators between items
+            pos = self._pos
+            while pos < len(text) and text[pos] in " \t\r\n,":
+                pos += 1
+            self._pos = pos
+            if pos == len(text):
+                return events
+            
+            quote = text[pos]
+            if quote == "]" or quote not in "\"'":
+                # End of the list, or an unquoted item the final parse will handle
+                self._field = None
+                self._pos = pos + 1
+                continue
+            
+            # Find the closing quote, skipping escaped characters
+            end = pos + 1
+            while end < len(text) and text[end] != quote:
+                end += 2 if text[end] == "\\" else 1
+            if end >= len(text):
+                return events
+            
+            raw = text[pos:end + 1]
+            if quote == '"':
+                try:
+                    value = json.loads(raw)
+                except json.JSONDecodeError:
+                    value = raw[1:-1]
+            else:
+                value = raw[1:-1]
+            if self._field == "data_sources":
+                value = _clean_source(value)
+            events.append((self._field, value))
+            self._pos = end + 1
+
 class ResponseProcessor:
     """Process responses from the LLM."""
     
     @staticmethod
-    def process_search_terms(response: str) -> Tuple[List[str], List[str], str]:
+    def process_search_terms(response: str) -> Tuple[Tuple[str, ...], Tuple[str, ...], str]:
         """
         Process search terms from LLM response.
         
@@ -19,135 +208,66 @@ class ResponseProcessor:
             response: LLM response.
             
         Returns:
-            Tuple[List[str], List[str], str]: Search terms, data sources, and explanation.
+            Tuple[Tuple[str, ...], Tuple[str, ...], str]: Search terms, data sources, and explanation.
         """
-        logger = setup_logger("processors")
-        
-        logger.info(f"Processing search terms from response: {response[:100]}...")
+        log.info("Processing search terms from response: %s...", response[:100])
         
         # First, try to extract JSON from the response
         try:
             # Look for JSON pattern with code block
-            json_match = re.search(r"```json\s*(.+?)\s*```", response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(1)
-                logger.info(f"Found JSON string in response: {json_str}")
+            json_str = _find_json_block(response)
+            if json_str:
+                log.info("Found JSON string in response: %s", json_str)
                 
                 try:
-                    json_data = json.loads(json_str)
-                    logger.info(f"Successfully parsed JSON data: {json_data}")
-                    
-                    # Extract search terms from JSON
-                    search_terms = []
-                    data_sources = []
-                    explanation = ""
-                    
-                    if "Search Terms" in json_data:
-                        search_terms = json_data["Search Terms"]
-                        logger.info(f"Extracted search terms from JSON: {search_terms}")
-                    
-                    # Extract data sources from JSON
-                    if "Data Sources" in json_data:
-                        data_sources = json_data["Data Sources"]
-                        logger.info(f"Extracted data sources from JSON: {data_sources}")
-                    
-                    # Extract explanation from JSON
-                    if "Explanation" in json_data:
-                        explanation = json_data["Explanation"]
-                        logger.info(f"Extracted explanation from JSON: {explanation}")
-                    
-                    return search_terms, data_sources, explanation
+                    return ResponseProcessor._extract_from_json_dict(json.loads(json_str))
                 except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse JSON string: {e}")
+                    log.warning("Failed to parse JSON string: %s", e)
             
             # Try to find JSON without code block markers
-            curly_match = re.search(r"(\{.+\})", response, re.DOTALL)
-            if curly_match:
-                json_str = curly_match.group(1)
-                logger.info(f"Found potential JSON without code block: {json_str}")
-                
-                try:
-                    json_data = json.loads(json_str)
-                    logger.info(f"Successfully parsed JSON data without code block: {json_data}")
-                    
-                    # Extract search terms from JSON
-                    search_terms = []
-                    data_sources = []
-                    explanation = ""
-                    
-                    if "Search Terms" in json_data:
-                        search_terms = json_data["Search Terms"]
-                        logger.info(f"Extracted search terms from JSON: {search_terms}")
-                    
-                    # Extract data sources from JSON
-                    if "Data Sources" in json_data:
-                        data_sources = json_data["Data Sources"]
-                        logger.info(f"Extracted data sources from JSON: {data_sources}")
-                    
-                    # Extract explanation from JSON
-                    if "Explanation" in json_data:
-                        explanation = json_data["Explanation"]
-                        logger.info(f"Extracted explanation from JSON: {explanation}")
-                    
-                    return search_terms, data_sources, explanation
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse JSON without code block: {e}")
+            json_data = _decode_json_object(response)
+            if json_data is not None:
+                log.info("Found JSON without code block: %s", json_data)
+                return ResponseProcessor._extract_from_json_dict(json_data)
         except Exception as e:
-            logger.warning(f"Failed to extract JSON from response: {e}")
+            log.warning("Failed to extract JSON from response: %s", e)
         
         # If JSON parsing fails, fall back to regex extraction
         # Extract search terms
-        search_terms_match = re.search(r"Search Terms:\s*(.+?)(?:\n|$)", response, re.DOTALL)
+        search_terms_match = _SEARCH_TERMS_RE.search(response)
         search_terms = []
         if search_terms_match:
             terms_text = search_terms_match.group(1).strip()
-            logger.info(f"Extracted search terms text: {terms_text}")
+            log.info("Extracted search terms text: %s", terms_text)
             
             # Try to parse as JSON array first
-            try:
-                if terms_text.startswith("[") and terms_text.endswith("]"):
-                    # Try to parse as JSON
-                    parsed_terms = json.loads(terms_text)
-                    if isinstance(parsed_terms, list):
-                        search_terms = parsed_terms
-                        logger.info(f"Successfully parsed search terms as JSON array: {search_terms}")
-                    else:
-                        logger.warning(f"Parsed JSON is not a list: {parsed_terms}")
-                        search_terms = [terms_text]
-            except json.JSONDecodeError:
-                # Try to parse as Python literal
+            if terms_text.startswith("[") and terms_text.endswith("]"):
                 try:
-                    if terms_text.startswith("[") and terms_text.endswith("]"):
-                        parsed_terms = ast.literal_eval(terms_text)
-                        if isinstance(parsed_terms, list):
-                            search_terms = parsed_terms
-                            logger.info(f"Successfully parsed search terms as Python literal: {search_terms}")
-                        else:
-                            logger.warning(f"Parsed literal is not a list: {parsed_terms}")
-                            search_terms = [terms_text]
-                    else:
-                        # Fall back to regular parsing
-                        if "," in terms_text:
-                            search_terms = [term.strip() for term in terms_text.split(",")]
-                        elif "\n" in terms_text:
-                            search_terms = [term.strip().lstrip("- ") for term in terms_text.split("\n")]
-                        else:
-                            search_terms = [terms_text]
-                except (SyntaxError, ValueError):
-                    # Fall back to regular parsing
-                    if "," in terms_text:
-                        search_terms = [term.strip() for term in terms_text.split(",")]
-                    elif "\n" in terms_text:
-                        search_terms = [term.strip().lstrip("- ") for term in terms_text.split("\n")]
-                    else:
-                        search_terms = [terms_text]
+                    parsed_terms = json.loads(terms_text)
+                except json.JSONDecodeError:
+                    # Python-style single-quoted list; normalize quotes and retry
+                    try:
+                        parsed_terms = json.loads(terms_text.replace("'", '"'))
+                    except json.JSONDecodeError:
+                        parsed_terms = None
+                if isinstance(parsed_terms, list):
+                    search_terms = parsed_terms
+                    log.info("Successfully parsed search terms as JSON array: %s", search_terms)
+                elif parsed_terms is not None:
+                    log.warning("Parsed JSON is not a list: %s", parsed_terms)
+                    search_terms = [terms_text]
+                else:
+                    search_terms = _split_terms(terms_text)
+            else:
+                # Fall back to regular parsing
+                search_terms = _split_terms(terms_text)
         
         # Extract data sources
-        data_sources_match = re.search(r"Data Sources:\s*(.+?)(?:\n|$)", response, re.DOTALL)
+        data_sources_match = _DATA_SOURCES_RE.search(response)
         data_sources = []
         if data_sources_match:
             sources_text = data_sources_match.group(1).strip()
-            logger.info(f"Extracted data sources text: {sources_text}")
+            log.info("Extracted data sources text: %s", sources_text)
             
             # Handle different formats
             if "," in sources_text:
@@ -157,60 +277,59 @@ class ResponseProcessor:
             else:
                 data_sources = [sources_text.lower()]
             
-            # Clean up data sources - remove any additional text like "as per user's preference"
-            cleaned_sources = []
-            for source in data_sources:
-                # Extract just the connector name
-                if isinstance(source, str):
-                    # Common patterns to clean up
-                    source = source.split(" as per ")[0].strip()
-                    source = source.split(" based on ")[0].strip()
-                    source = source.split(" according to ")[0].strip()
-                    source = source.split(" following ")[0].strip()
-                    
-                    # Remove any remaining text after the connector name
-                    for connector in ["kaggle", "huggingface", "google_dataset"]:
-                        if connector in source.lower():
-                            source = connector
-                            break
-                
-                cleaned_sources.append(source)
-            
-            logger.info(f"Cleaned data sources: {cleaned_sources}")
-            data_sources = cleaned_sources
-            
-            logger.info(f"Initial data sources: {data_sources}")
-            
-            # Ensure each data source is a string, not a list
-            normalized_sources = []
-            for source in data_sources:
-                if isinstance(source, list):
-                    logger.warning(f"Found list in data sources: {source}")
-                    if source:
-                        normalized_sources.append(source[0])
-                    else:
-                        logger.warning("Empty list in data sources")
-                else:
-                    normalized_sources.append(source)
-            
-            if normalized_sources != data_sources:
-                logger.info(f"Normalized data sources: {normalized_sources}")
-                data_sources = normalized_sources
-            
-            # Check for any remaining lists and convert to strings
-            for i, source in enumerate(data_sources):
-                if isinstance(source, list):
-                    logger.warning(f"Still found list at index {i}: {source}")
-                    data_sources[i] = str(source)
+            # Clean up data sources; splitting text only yields strings, so no further
+            # normalization is needed
+            data_sources = [_clean_source(source) for source in data_sources]
+            log.info("Cleaned data sources: %s", data_sources)
         
         # Extract explanation
-        explanation_match = re.search(r"Explanation:\s*(.+?)(?:\n\n|$)", response, re.DOTALL)
+        explanation_match = _EXPLANATION_RE.search(response)
         explanation = explanation_match.group(1).strip() if explanation_match else ""
         
-        logger.info(f"Final search terms: {search_terms}")
-        logger.info(f"Final data sources: {data_sources}")
+        log.info("Final search terms: %s", search_terms)
+        log.info("Final data sources: %s", data_sources)
         
-        return search_terms, data_sources, explanation
+        return tuple(search_terms), tuple(data_sources), explanation
+    
+    @staticmethod
+    async def process_search_terms_stream(chunks: AsyncIterator[str]) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Process search terms from a streamed LLM response.
+        
+        Search terms and data sources are yielded as soon as each one is complete, so
+        callers can start searching before the response has finished. The full response
+        is then parsed with process_search_terms, whose result is the authoritative one.
+        
+        Args:
+            chunks: Pieces of the LLM response, in order.
+            
+        Yields:
+            Tuple[str, Any]: ``("search_terms", term)`` and ``("data_sources", source)``
+                events, followed by a final ``("result", (search_terms, data_sources,
+                explanation))`` event.
+        """
+        parser = _SearchTermsParser()
+        async for chunk in chunks:
+            for event in parser.feed(chunk):
+                yield event
+        yield "result", ResponseProcessor.process_search_terms(parser.text)
+    
+    @staticmethod
+    def _extract_from_json_dict(json_data: Dict[str, Any]) -> Tuple[Tuple[str, ...], Tuple[str, ...], str]:
+        """
+        Extract search terms, data sources, and explanation from parsed JSON.
+        
+        Args:
+            json_data: Parsed JSON object from the LLM response.
+            
+        Returns:
+            Tuple[Tuple[str, ...], Tuple[str, ...], str]: Search terms, data sources, and explanation.
+        """
+        return (
+            _as_tuple(json_data.get("Search Terms")),
+            _as_tuple(json_data.get("Data Sources")),
+            json_data.get("Explanation", ""),
+        )
     
     @staticmethod
     def process_dataset_analysis(response: str) -> Dict[str, Any]:
@@ -224,7 +343,7 @@ class ResponseProcessor:
             Dict[str, Any]: Processed analysis.
         """
         # Extract ranking
-        ranking_match = re.search(r"Ranking:(.*?)(?:Detailed Analysis:|$)", response, re.DOTALL)
+        ranking_match = _RANKING_RE.search(response)
         ranking = []
         if ranking_match:
             ranking_text = ranking_match.group(1).strip()
@@ -232,51 +351,40 @@ class ResponseProcessor:
             
             for line in ranking_lines:
                 # Extract dataset name and explanation
-                rank_match = re.match(r"\d+\.\s*([^-]+)\s*-\s*(.+)", line)
+                rank_match = _RANK_LINE_RE.match(line)
                 if rank_match:
                     dataset_name = rank_match.group(1).strip()
                     explanation = rank_match.group(2).strip()
                     ranking.append({"name": dataset_name, "explanation": explanation})
         
         # Extract detailed analysis
-        analysis_match = re.search(r"Detailed Analysis:(.*?)(?:Overall Recommendation:|$)", response, re.DOTALL)
+        analysis_match = _ANALYSIS_RE.search(response)
         analysis = {}
         if analysis_match:
             analysis_text = analysis_match.group(1).strip()
             
             # Split by dataset names
-            dataset_sections = re.split(r"\n\s*\[([^\]]+)\]:\s*\n", analysis_text)
+            dataset_sections = _DATASET_SPLIT_RE.split(analysis_text)
             
             # Process each dataset section
             for i in range(1, len(dataset_sections), 2):
                 dataset_name = dataset_sections[i].strip()
                 dataset_analysis = dataset_sections[i+1].strip()
                 
-                # Extract relevance
-                relevance_match = re.search(r"Relevance:\s*([^\n]+)", dataset_analysis)
-                relevance = relevance_match.group(1).strip() if relevance_match else "Unknown"
-                
-                # Extract strengths
-                strengths_match = re.search(r"Strengths:\s*([^\n]+)", dataset_analysis)
-                strengths = strengths_match.group(1).strip() if strengths_match else "Unknown"
-                
-                # Extract limitations
-                limitations_match = re.search(r"Limitations:\s*([^\n]+)", dataset_analysis)
-                limitations = limitations_match.group(1).strip() if limitations_match else "Unknown"
-                
-                # Extract recommendation
-                recommendation_match = re.search(r"Recommendation:\s*([^\n]+)", dataset_analysis)
-                recommendation = recommendation_match.group(1).strip() if recommendation_match else "Unknown"
+                # Extract all fields in one pass, keeping the first value of each
+                fields = {}
+                for field, value in _FIELD_RE.findall(dataset_analysis):
+                    fields.setdefault(field, value.strip())
                 
                 analysis[dataset_name] = {
-                    "relevance": relevance,
-                    "strengths": strengths,
-                    "limitations": limitations,
-                    "recommendation": recommendation,
+                    "relevance": fields.get("Relevance", "Unknown"),
+                    "strengths": fields.get("Strengths", "Unknown"),
+                    "limitations": fields.get("Limitations", "Unknown"),
+                    "recommendation": fields.get("Recommendation", "Unknown"),
                 }
         
         # Extract overall recommendation
-        recommendation_match = re.search(r"Overall Recommendation:\s*(.+?)(?:\n\n|$)", response, re.DOTALL)
+        recommendation_match = _OVERALL_RE.search(response)
         overall_recommendation = recommendation_match.group(1).strip() if recommendation_match else ""
         
         return {
@@ -311,22 +419,12 @@ class ResponseProcessor:
             Optional[Dict[str, Any]]: Extracted JSON or None if not found.
         """
         # Look for JSON pattern
-        json_match = re.search(r"```json\s*(.+?)\s*```", response, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(1)
+        json_str = _find_json_block(response)
+        if json_str:
             try:
                 return json.loads(json_str)
             except json.JSONDecodeError:
                 return None
         
         # Try to find JSON without code block markers
-        try:
-            # Look for patterns that might indicate JSON
-            curly_match = re.search(r"(\{.+\})", response, re.DOTALL)
-            if curly_match:
-                json_str = curly_match.group(1)
-                return json.loads(json_str)
-        except json.JSONDecodeError:
-            pass
-        
-        return None
+        return _decode_json_object(response)
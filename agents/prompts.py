@@ -3,24 +3,10 @@ Prompt templates for the LLM agent.
 """
 from typing import Dict, List, Any
 
-class PromptTemplates:
-    """Prompt templates for the LLM agent."""
-    
-    @staticmethod
-    def dataset_search_prompt(query: str, context: Dict[str, Any] = None) -> str:
-        """
-        Generate a prompt for dataset search.
-        
-        Args:
-            query: User query.
-            context: Additional context.
-            
-        Returns:
-            str: Prompt for the LLM.
-        """
-        context = context or {}
-        
-        prompt = f"""
+from data_sources import DatasetInfo
+
+# Prompt skeletons, filled in with str.format_map
+_SEARCH_PROMPT_TMPL = """
         You are a helpful assistant that helps users find datasets. Your task is to understand the user's query and formulate appropriate search terms to find relevant datasets.
         
         User Query: {query}
@@ -40,55 +26,45 @@ class PromptTemplates:
         
         Note: The search terms and data sources should be provided as arrays with each item in quotes.
         """
-        
-        # Add additional context if available
-        if context.get("previous_searches"):
-            prompt += f"\n\nPrevious searches: {context['previous_searches']}"
-        
-        if context.get("user_preferences"):
-            user_prefs = context["user_preferences"]
-            prompt += f"\n\nUser preferences: {user_prefs}"
-            
-            # If user has specified data sources, make it clear in the prompt
-            if "data_sources" in user_prefs and user_prefs["data_sources"]:
-                prompt += f"""
+
+_USER_SOURCES_TMPL = """
                 
-                CRITICAL INSTRUCTION: The user has specifically selected ONLY the following data sources: {user_prefs["data_sources"]}
+                CRITICAL INSTRUCTION: The user has specifically selected ONLY the following data sources: {data_sources}
                 You MUST ONLY suggest these exact data sources in your response. DO NOT suggest any other data sources.
-                Your Data Sources response MUST be EXACTLY: {user_prefs["data_sources"]}
+                Your Data Sources response MUST be EXACTLY: {data_sources}
                 Any other data sources will be ignored, and only the user-selected ones will be used.
                 """
+
+_SEARCH_TERMS_ONLY_PROMPT_TMPL = """
+        You are a helpful assistant that helps users find datasets. Your task is to understand the user's query and formulate appropriate search terms to find relevant datasets.
         
-        return prompt
-    
-    @staticmethod
-    def dataset_analysis_prompt(query: str, datasets: List[Dict[str, Any]]) -> str:
-        """
-        Generate a prompt for dataset analysis.
+        User Query: {query}
         
-        Args:
-            query: User query.
-            datasets: List of datasets.
-            
-        Returns:
-            str: Prompt for the LLM.
+        The user will search these data sources: {user_sources}
+        
+        Based on the user's query, what would be the most effective search terms to find relevant datasets on these sources?
+        
+        Provide your response in the following format:
+        
+        Search Terms: ["term1", "term2", "term3"]
+        Explanation: brief explanation of your reasoning
+        
+        Note: The search terms should be provided as an array with each item in quotes.
         """
-        # Format datasets as a string
-        datasets_str = ""
-        for i, dataset in enumerate(datasets):
-            datasets_str += f"""
-            Dataset {i+1}:
-            - Name: {dataset.get('name', 'Unknown')}
-            - Description: {dataset.get('description', 'No description available')}
-            - Source: {dataset.get('source', 'Unknown')}
-            - Size: {dataset.get('size', 'Unknown')}
-            - Format: {dataset.get('format', 'Unknown')}
-            - License: {dataset.get('license', 'Unknown')}
-            - Tags: {', '.join(dataset.get('tags', []))}
-            - URL: {dataset.get('url', 'Unknown')}
+
+_DATASET_BLOCK_TMPL = """
+            Dataset {index}:
+            - Name: {name}
+            - Description: {description}
+            - Source: {source}
+            - Size: {size}
+            - Format: {format}
+            - License: {license}
+            - Tags: {tags}
+            - URL: {url}
             """
-        
-        prompt = f"""
+
+_ANALYSIS_PROMPT_TMPL = """
         You are a helpful assistant that helps users find and analyze datasets. Your task is to analyze the datasets below and determine which ones are most relevant to the user's query.
         
         User Query: {query}
@@ -123,6 +99,136 @@ class PromptTemplates:
         Overall Recommendation:
         [Your overall recommendation based on the user's query and available datasets]
         """
+
+_RECOMMENDATION_PROMPT_TMPL = """
+        You are a helpful assistant that helps users find datasets. Based on the user's query and the available datasets, provide a concise recommendation.
+        
+        User Query: {query}
+        
+        Top Datasets:
+        {datasets_str}
+        
+        Provide a brief recommendation of which dataset(s) would be most suitable for the user's needs and why. Keep your response concise and focused on the most relevant options.
+        """
+
+def _build_search_prompt(query: str, context: Dict[str, Any] = None) -> str:
+    """
+    Build the dataset search prompt.
+    
+    Args:
+        query: User query.
+        context: Additional context.
+        
+    Returns:
+        str: Prompt for the LLM.
+    """
+    context = context or {}
+    
+    prompt = _SEARCH_PROMPT_TMPL.format_map({"query": query})
+    
+    # Add additional context if available
+    if context.get("previous_searches"):
+        prompt += f"\n\nPrevious searches: {context['previous_searches']}"
+    
+    user_prefs = context.get("user_preferences")
+    if user_prefs:
+        prompt += f"\n\nUser preferences: {user_prefs}"
+        
+        # If user has specified data sources, make it clear in the prompt
+        data_sources = user_prefs.get("data_sources")
+        if data_sources:
+            prompt += _USER_SOURCES_TMPL.format_map({"data_sources": data_sources})
+    
+    return prompt
+
+def _build_search_prompt_terms_only(query: str, context: Dict[str, Any] = None, user_sources: List[str] = None) -> str:
+    """
+    Build the terms-only dataset search prompt.
+    
+    Args:
+        query: User query.
+        context: Additional context.
+        user_sources: Data sources selected by the user.
+        
+    Returns:
+        str: Prompt for the LLM.
+    """
+    context = context or {}
+    
+    prompt = _SEARCH_TERMS_ONLY_PROMPT_TMPL.format_map({"query": query, "user_sources": user_sources})
+    
+    # Add additional context if available
+    if context.get("previous_searches"):
+        prompt += f"\n\nPrevious searches: {context['previous_searches']}"
+    
+    # The data sources are already fixed, so only pass on the other preferences
+    user_prefs = {key: value for key, value in context.get("user_preferences", {}).items() if key != "data_sources"}
+    if user_prefs:
+        prompt += f"\n\nUser preferences: {user_prefs}"
+    
+    return prompt
+
+class PromptTemplates:
+    """Prompt templates for the LLM agent."""
+    
+    @staticmethod
+    def dataset_search_prompt(query: str, context: Dict[str, Any] = None) -> str:
+        """
+        Generate a prompt for dataset search.
+        
+        Args:
+            query: User query.
+            context: Additional context.
+            
+        Returns:
+            str: Prompt for the LLM.
+        """
+        return _build_search_prompt(query, context)
+    
+    @staticmethod
+    def dataset_search_prompt_terms_only(query: str, context: Dict[str, Any] = None, user_sources: List[str] = None) -> str:
+        """
+        Generate a shorter dataset search prompt for when the user has already chosen the data sources.
+        
+        Args:
+            query: User query.
+            context: Additional context.
+            user_sources: Data sources selected by the user.
+            
+        Returns:
+            str: Prompt for the LLM.
+        """
+        return _build_search_prompt_terms_only(query, context, user_sources)
+    
+    @staticmethod
+    def dataset_analysis_prompt(query: str, datasets: List[DatasetInfo]) -> str:
+        """
+        Generate a prompt for dataset analysis.
+        
+        Args:
+            query: User query.
+            datasets: List of datasets.
+            
+        Returns:
+            str: Prompt for the LLM.
+        """
+        # Format datasets as a string
+        datasets_str = "".join(
+            _DATASET_BLOCK_TMPL.format_map({
+                "index": i + 1,
+                "name": dataset.name or "Unknown",
+                "description": dataset.description or "No description available",
+                "source": dataset.source or "Unknown",
+                "size": dataset.size or "Unknown",
+                "format": dataset.format or "Unknown",
+                "license": dataset.license or "Unknown",
+                "tags": ", ".join(dataset.tags),
+                "url": dataset.url or "Unknown",
+            })
+            for i, dataset in enumerate(datasets)
+        )
+        
+        prompt = _ANALYSIS_PROMPT_TMPL.format_map({"query": query, "datasets_str": datasets_str})
         
         return prompt
     
@@ -139,25 +245,17 @@ class PromptTemplates:
             str: Prompt for the LLM.
         """
         # Format datasets as a string (abbreviated version)
-        datasets_str = ""
+        parts = []
         for i, dataset in enumerate(datasets[:5]):  # Limit to top 5 for brevity
-            datasets_str += f"""
+            parts.append(f"""
             Dataset {i+1}:
             - Name: {dataset.get('name', 'Unknown')}
             - Description: {dataset.get('description', 'No description available')[:100]}...
             - Source: {dataset.get('source', 'Unknown')}
             - Tags: {', '.join(dataset.get('tags', [])[:5])}
-            """
-        
-        prompt = f"""
-        You are a helpful assistant that helps users find datasets. Based on the user's query and the available datasets, provide a concise recommendation.
+            """)
+        datasets_str = "".join(parts)
         
-        User Query: {query}
-        
-        Top Datasets:
-        {datasets_str}
-        
-        Provide a brief recommendation of which dataset(s) would be most suitable for the user's needs and why. Keep your response concise and focused on the most relevant options.
-        """
+        prompt = _RECOMMENDATION_PROMPT_TMPL.format_map({"query": query, "datasets_str": datasets_str})
         
         return prompt
@@ -4,64 +4,69 @@ Dataset card component for the Streamlit application.
 import streamlit as st
 from typing import Dict, Any, Optional
 
-def dataset_card(dataset: Dict[str, Any], show_details: bool = False) -> None:
+# Styles shared by every dataset card
+CARD_CSS = """
+<style>
+.dataset-card {
+    border: 1px solid #ddd;
+    border-radius: 5px;
+    padding: 15px;
+    margin-bottom: 15px;
+}
+</style>
+"""
+
+def _inject_card_css() -> None:
+    """Add the dataset card styles to the page."""
+    st.markdown(CARD_CSS, unsafe_allow_html=True)
+
+def dataset_card(dataset: Dict[str, Any], show_details: bool = False, inject_css: bool = True) -> None:
     """
     Display a dataset card.
     
     Args:
         dataset: Dataset information.
         show_details: Whether to show details.
+        inject_css: Whether to add the card styles. Callers rendering many cards should
+            add them once with _inject_card_css and pass False.
     """
-    # Create a card-like container
-    with st.container():
-        # Add a border and padding
-        st.markdown(
-            """
-            <style>
-            .dataset-card {
-                border: 1px solid #ddd;
-                border-radius: 5px;
-                padding: 15px;
-                margin-bottom: 15px;
-            }
-            </style>
-            """,
-            unsafe_allow_html=True,
-        )
+    if inject_css:
+        _inject_card_css()
+    
+    # Display dataset name and source
+    lines = [
+        f"### {dataset['name']}",
+        f"**Source:** {dataset['source']}",
+    ]
+    
+    # Display description (truncated if not showing details)
+    description = dataset.get('description') or 'No description available'
+    if not show_details and len(description) > 200:
+        lines.append(f"**Description:** {description[:200]}...")
+    else:
+        lines.append(f"**Description:** {description}")
+    
+    # Display additional information if available
+    if show_details:
+        if dataset.get('url'):
+            lines.append(f"**URL:** [{dataset['url']}]({dataset['url']})")
         
-        # Start the card
-        st.markdown('<div class="dataset-card">', unsafe_allow_html=True)
+        if dataset.get('size'):
+            lines.append(f"**Size:** {dataset['size']}")
         
-        # Display dataset name and source
-        st.markdown(f"### {dataset['name']}")
-        st.markdown(f"**Source:** {dataset['source']}")
+        if dataset.get('format'):
+            lines.append(f"**Format:** {dataset['format']}")
         
-        # Display description (truncated if not showing details)
-        description = dataset.get('description', 'No description available')
-        if not show_details and len(description) > 200:
-            st.markdown(f"**Description:** {description[:200]}...")
-        else:
-            st.markdown(f"**Description:** {description}")
+        if dataset.get('license'):
+            lines.append(f"**License:** {dataset['license']}")
         
-        # Display additional information if available
-        if show_details:
-            if dataset.get('url'):
-                st.markdown(f"**URL:** [{dataset['url']}]({dataset['url']})")
-            
-            if dataset.get('size'):
-                st.markdown(f"**Size:** {dataset['size']}")
-            
-            if dataset.get('format'):
-                st.markdown(f"**Format:** {dataset['format']}")
-            
-            if dataset.get('license'):
-                st.markdown(f"**License:** {dataset['license']}")
-            
-            if dataset.get('tags'):
-                st.markdown(f"**Tags:** {', '.join(dataset['tags'])}")
-        
-        # End the card
-        st.markdown('</div>', unsafe_allow_html=True)
+        if dataset.get('tags'):
+            lines.append(f"**Tags:** {', '.join(dataset['tags'])}")
+    
+    # Render the whole card as a single element; the blank lines let the markdown
+    # inside the card div be parsed
+    body = "\n\n".join(lines)
+    st.markdown(f'<div class="dataset-card">\n\n{body}\n\n</div>', unsafe_allow_html=True)
 
 def dataset_grid(datasets: list, cols: int = 2) -> None:
     """
@@ -71,13 +76,16 @@ def dataset_grid(datasets: list, cols: int = 2) -> None:
         datasets: List of datasets.
         cols: Number of columns.
     """
+    # Add the card styles once for the whole grid
+    _inject_card_css()
+    
     # Create columns
     columns = st.columns(cols)
     
     # Display datasets in columns
     for i, dataset in enumerate(datasets):
         with columns[i % cols]:
-            dataset_card(dataset)
+            dataset_card(dataset, inject_css=False)
             
             # Add a button to view details
             if st.button(f"View Details", key=f"view_{i}"):
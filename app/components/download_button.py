@@ -2,9 +2,11 @@
 Download button component for the Streamlit application.
 """
 import os
+import functools
 import streamlit as st
+import pandas as pd
 import time
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, Iterable
 
 from data_sources import get_connector
 from utils.downloader import downloader, DownloadStatus
@@ -13,6 +15,16 @@ from utils.logger import setup_logger
 # Set up logger
 log = setup_logger("download_button")
 
+# Units used by format_size
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+# Seconds between refreshes of the download progress widgets
+PROGRESS_REFRESH_INTERVAL = 1.0
+
+# Seconds a polled download status is reused, so every widget showing the same
+# download during one refresh shares a single lookup
+_STATUS_TTL = PROGRESS_REFRESH_INTERVAL / 4
+
 def format_size(bytes: int) -> str:
     """
     Format size in bytes to human-readable format.
@@ -26,16 +38,15 @@ def format_size(bytes: int) -> str:
     if bytes is None or bytes == 0:
         return "Unknown"
     
-    # Convert to appropriate unit
-    units = ["B", "KB", "MB", "GB", "TB"]
-    size = float(bytes)
-    unit_index = 0
-    
-    while size >= 1024 and unit_index < len(units) - 1:
-        size /= 1024
-        unit_index += 1
-    
-    return f"{size:.2f} {units[unit_index]}"
+    # Speeds arrive as floats; whole bytes are enough for display and keep the cache small
+    return _format_size_cached(int(bytes))
+
+@functools.lru_cache(maxsize=4096)
+def _format_size_cached(bytes: int) -> str:
+    """Format a whole number of bytes; see format_size."""
+    # Each unit is 2**10 times the previous, so the bit length picks it directly
+    unit_index = min(max(bytes.bit_length() - 1, 0) // 10, len(_SIZE_UNITS) - 1)
+    return f"{bytes / (1 << (unit_index * 10)):.2f} {_SIZE_UNITS[unit_index]}"
 
 def format_time(seconds: float) -> str:
     """
@@ -50,6 +61,12 @@ def format_time(seconds: float) -> str:
     if seconds is None or seconds < 0:
         return "Unknown"
     
+    # Whole seconds are enough for display and keep the cache small
+    return _format_time_cached(int(seconds))
+
+@functools.lru_cache(maxsize=4096)
+def _format_time_cached(seconds: int) -> str:
+    """Format a whole number of seconds; see format_time."""
     if seconds < 60:
         return f"{seconds:.0f} seconds"
     elif seconds < 3600:
@@ -59,6 +76,97 @@ def format_time(seconds: float) -> str:
         hours = seconds / 3600
         return f"{hours:.1f} hours"
 
+def _init_download_state() -> None:
+    """Initialize session state for downloads if not exists."""
+    if "downloads" not in st.session_state:
+        st.session_state.downloads = {}
+    if "downloads_by_dataset" not in st.session_state:
+        # Reverse index from dataset ID to download ID, kept in sync by _add_download
+        # and _remove_download
+        st.session_state.downloads_by_dataset = {
+            d_info.get("dataset_id"): d_id for d_id, d_info in reversed(st.session_state.downloads.items())
+        }
+
+def _add_download(download_id: str, info: Dict[str, Any]) -> None:
+    """
+    Track a download in session state.
+    
+    Args:
+        download_id: Download task ID.
+        info: Download information, including the dataset ID.
+    """
+    st.session_state.downloads[download_id] = info
+    st.session_state.downloads_by_dataset[info["dataset_id"]] = download_id
+
+def _remove_download(download_id: str) -> None:
+    """
+    Stop tracking a download in session state.
+    
+    Args:
+        download_id: Download task ID.
+    """
+    info = st.session_state.downloads.pop(download_id, None)
+    if info is not None and st.session_state.downloads_by_dataset.get(info.get("dataset_id")) == download_id:
+        del st.session_state.downloads_by_dataset[info.get("dataset_id")]
+
+def _get_status_once(download_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the status of a download, reusing a status polled moments ago.
+    
+    Args:
+        download_id: Download task ID.
+        
+    Returns:
+        Optional[Dict[str, Any]]: Download status or None if not found.
+    """
+    return _get_statuses_once([download_id])[download_id]
+
+def _get_statuses_once(download_ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Get the statuses of several downloads, reusing statuses polled moments ago and
+    fetching the rest from the downloader in one batch.
+    
+    Args:
+        download_ids: Download task IDs.
+        
+    Returns:
+        Dict[str, Optional[Dict[str, Any]]]: Download status for each ID, or None if not found.
+    """
+    cached = st.session_state.setdefault("_download_statuses", {})
+    now = time.monotonic()
+    
+    statuses = {}
+    stale = []
+    for download_id in download_ids:
+        entry = cached.get(download_id)
+        if entry is not None and now - entry[0] < _STATUS_TTL:
+            statuses[download_id] = entry[1]
+        else:
+            stale.append(download_id)
+    
+    if stale:
+        for download_id, status in downloader.get_download_statuses(stale).items():
+            if status is None:
+                cached.pop(download_id, None)
+            else:
+                cached[download_id] = (now, status)
+            statuses[download_id] = status
+    
+    return statuses
+
+@st.cache_data(ttl=5, show_spinner=False)
+def _file_exists(path: str) -> bool:
+    """
+    Check whether a downloaded file exists, rechecking at most every few seconds.
+    
+    Args:
+        path: File path.
+        
+    Returns:
+        bool: True if the file exists.
+    """
+    return os.path.exists(path)
+
 def download_button(dataset: Dict[str, Any], key: str = "download") -> None:
     """
     Display a download button for a dataset.
@@ -68,8 +176,7 @@ def download_button(dataset: Dict[str, Any], key: str = "download") -> None:
         key: Unique key for the button.
     """
     # Initialize session state for downloads if not exists
-    if "downloads" not in st.session_state:
-        st.session_state.downloads = {}
+    _init_download_state()
     
     # Get dataset information
     dataset_id = dataset.get("id")
@@ -81,11 +188,7 @@ def download_button(dataset: Dict[str, Any], key: str = "download") -> None:
         return
     
     # Check if already downloading
-    download_id = None
-    for d_id, d_info in st.session_state.downloads.items():
-        if d_info.get("dataset_id") == dataset_id:
-            download_id = d_id
-            break
+    download_id = st.session_state.downloads_by_dataset.get(dataset_id)
     
     # If not downloading, show download button
     if not download_id:
@@ -97,21 +200,18 @@ def download_button(dataset: Dict[str, Any], key: str = "download") -> None:
                     st.error(f"Connector not found for source: {source}")
                     return
                 
-                # Ensure Datasets directory exists
-                os.makedirs("Datasets", exist_ok=True)
-                
                 # Start download
                 download_id = connector.download_dataset(dataset_id)
                 
                 if download_id:
                     # Store download information
-                    st.session_state.downloads[download_id] = {
+                    _add_download(download_id, {
                         "dataset_id": dataset_id,
                         "dataset_name": dataset_name,
                         "source": source,
                         "status": DownloadStatus.PENDING,
                         "progress": 0.0,
-                    }
+                    })
                     
                     # Force rerun to show progress
                     st.rerun()
@@ -119,26 +219,64 @@ def download_button(dataset: Dict[str, Any], key: str = "download") -> None:
                     st.error(f"Failed to start download for dataset: {dataset_name}")
             except Exception as e:
                 st.error(f"Error starting download: {e}")
-                log.error(f"Error starting download: {e}")
+                log.error("Error starting download: %s", e)
     else:
         # Show download progress
-        download_progress(download_id)
+        download_progress(download_id, key=key)
 
-def download_progress(download_id: str) -> None:
+def download_progress(download_id: str, key: str = "download") -> None:
     """
     Display download progress.
     
+    While the download is pending or in progress, the progress is shown in a fragment
+    that refreshes itself, so polling the download status does not rerun the whole
+    page. Finished downloads are shown once, without polling.
+    
     Args:
         download_id: Download task ID.
+        key: Unique key for the progress widgets, so the same download can be shown in several places.
+    """
+    _init_download_state()
+    
+    status = st.session_state.downloads.get(download_id, {})
+    if status.get("status", DownloadStatus.PENDING) in [DownloadStatus.PENDING, DownloadStatus.DOWNLOADING]:
+        _live_download_progress(download_id, key)
+    else:
+        _download_progress_view(download_id, key)
+
+@st.fragment(run_every=PROGRESS_REFRESH_INTERVAL)
+def _live_download_progress(download_id: str, key: str) -> None:
+    """
+    Display download progress, refreshing it on its own while the download is active.
+    
+    Args:
+        download_id: Download task ID.
+        key: Unique key for the progress widgets.
+    """
+    status_text = _download_progress_view(download_id, key)
+    
+    # Once the download can no longer change, rerun the page so the progress stops polling
+    if status_text not in [DownloadStatus.PENDING, DownloadStatus.DOWNLOADING]:
+        st.rerun()
+
+def _download_progress_view(download_id: str, key: str) -> Optional[str]:
+    """
+    Display the progress of a download with its up-to-date status.
+    
+    Args:
+        download_id: Download task ID.
+        key: Unique key for the progress widgets.
+        
+    Returns:
+        Optional[str]: Download status, or None if the download no longer exists.
     """
     # Get download status
-    status = downloader.get_download_status(download_id)
+    status = _get_status_once(download_id)
     
     if not status:
         # Download not found, remove from session state
-        if download_id in st.session_state.downloads:
-            del st.session_state.downloads[download_id]
-        return
+        _remove_download(download_id)
+        return None
     
     # Update session state
     st.session_state.downloads[download_id] = status
@@ -162,26 +300,21 @@ def download_progress(download_id: str) -> None:
         with col1:
             st.markdown(f"Status: **{status_text.capitalize()}**")
             
-            if status_text == DownloadStatus.DOWNLOADING:
-                # Show cancel button
-                # Add timestamp to key to ensure uniqueness
-                import time
-                timestamp = int(time.time() * 1000)
-                if st.button("Cancel", key=f"cancel_{download_id}_{timestamp}"):
+            if status_text in (DownloadStatus.PENDING, DownloadStatus.DOWNLOADING):
+                # Show cancel button, also for downloads still waiting for a worker
+                if st.button("Cancel", key=f"{key}_cancel_{download_id}"):
                     downloader.cancel_download(download_id)
                     st.rerun()
             
             elif status_text == DownloadStatus.COMPLETED:
                 # Show open button
                 file_path = status.get("file_path")
-                if file_path and os.path.exists(file_path):
+                if file_path and _file_exists(file_path):
                     st.markdown(f"Saved to: **{file_path}**")
                 
                 # Clear button
-                import time
-                timestamp = int(time.time() * 1000)
-                if st.button("Clear", key=f"clear_{download_id}_{timestamp}"):
-                    del st.session_state.downloads[download_id]
+                if st.button("Clear", key=f"{key}_clear_{download_id}"):
+                    _remove_download(download_id)
                     st.rerun()
             
             elif status_text == DownloadStatus.FAILED:
@@ -190,35 +323,32 @@ def download_progress(download_id: str) -> None:
                 st.error(f"Error: {error}")
                 
                 # Retry button
-                import time
-                timestamp = int(time.time() * 1000)
-                if st.button("Retry", key=f"retry_{download_id}_{timestamp}"):
+                if st.button("Retry", key=f"{key}_retry_{download_id}"):
                     # Get dataset information
                     dataset_id = status.get("dataset_id")
                     source = status.get("source")
                     
                     # Remove old download
-                    del st.session_state.downloads[download_id]
+                    _remove_download(download_id)
                     
                     # Start new download
                     connector = get_connector(source.lower())
                     if connector:
                         new_download_id = connector.download_dataset(dataset_id)
                         if new_download_id:
-                            st.session_state.downloads[new_download_id] = {
+                            _add_download(new_download_id, {
                                 "dataset_id": dataset_id,
                                 "dataset_name": status.get("dataset_name"),
                                 "source": source,
                                 "status": DownloadStatus.PENDING,
                                 "progress": 0.0,
-                            }
+                            })
                     
                     st.rerun()
                 
                 # Clear button
-                timestamp2 = int(time.time() * 1000) + 1
-                if st.button("Clear", key=f"clear_error_{download_id}_{timestamp2}"):
-                    del st.session_state.downloads[download_id]
+                if st.button("Clear", key=f"{key}_clear_error_{download_id}"):
+                    _remove_download(download_id)
                     st.rerun()
             
             elif status_text == DownloadStatus.CANCELLED:
@@ -226,10 +356,8 @@ def download_progress(download_id: str) -> None:
                 st.warning("Download cancelled")
                 
                 # Clear button
-                import time
-                timestamp = int(time.time() * 1000)
-                if st.button("Clear", key=f"clear_cancelled_{download_id}_{timestamp}"):
-                    del st.session_state.downloads[download_id]
+                if st.button("Clear", key=f"{key}_clear_cancelled_{download_id}"):
+                    _remove_download(download_id)
                     st.rerun()
         
         with col2:
@@ -250,80 +378,106 @@ def download_progress(download_id: str) -> None:
                 
                 if eta > 0:
                     st.markdown(f"ETA: {format_time(eta)}")
+    
+    return status_text
 
 def downloads_sidebar() -> None:
     """Display active downloads in the sidebar."""
-    if "downloads" not in st.session_state:
-        st.session_state.downloads = {}
+    _init_download_state()
+    
+    if not st.session_state.downloads:
+        return
+    
+    # Fragments cannot write to the sidebar directly, so render the panel inside it.
+    # Only keep polling while a download can still change on its own.
+    with st.sidebar:
+        if _has_active_downloads(st.session_state.downloads):
+            _live_downloads_panel()
+        else:
+            _downloads_panel()
+
+def _has_active_downloads(downloads: Dict[str, Dict[str, Any]]) -> bool:
+    """
+    Check whether any download is still pending or in progress.
+    
+    Args:
+        downloads: Download statuses by download ID.
+        
+    Returns:
+        bool: True if a download is pending or in progress.
+    """
+    return any(
+        status.get("status", DownloadStatus.PENDING) in [DownloadStatus.PENDING, DownloadStatus.DOWNLOADING]
+        for status in downloads.values()
+    )
+
+@st.fragment(run_every=PROGRESS_REFRESH_INTERVAL)
+def _live_downloads_panel() -> None:
+    """Display the downloads panel, refreshing it on its own while downloads are active."""
+    _downloads_panel()
     
+    # Once nothing is left to change, rerun the page so the panel stops polling
+    if not _has_active_downloads(st.session_state.downloads):
+        st.rerun()
+
+def _downloads_panel() -> None:
+    """Display the downloads panel with up-to-date download statuses."""
     # Get all downloads
     downloads = st.session_state.downloads
     
-    if not downloads:
-        return
-    
     # Display downloads section
-    st.sidebar.markdown("---")
-    st.sidebar.subheader("Downloads")
+    st.markdown("---")
+    st.subheader("Downloads")
     
-    # Update download statuses
-    for download_id in list(downloads.keys()):
-        status = downloader.get_download_status(download_id)
+    # Update download statuses in place, removing vanished downloads afterwards
+    to_remove = []
+    for download_id, status in _get_statuses_once(downloads).items():
         if status:
-            st.session_state.downloads[download_id] = status
+            downloads[download_id] = status
         else:
-            # Download not found, remove from session state
-            del st.session_state.downloads[download_id]
+            to_remove.append(download_id)
+    
+    # Download not found, remove from session state
+    for download_id in to_remove:
+        _remove_download(download_id)
     
-    # Group downloads by status
-    active_downloads = []
-    completed_downloads = []
-    failed_downloads = []
+    # Group downloads by status into table rows
+    active_rows = []
+    completed_rows = []
+    failed_rows = []
     
-    for download_id, status in downloads.items():
+    for status in downloads.values():
         status_text = status.get("status", DownloadStatus.PENDING)
+        dataset_name = status.get("dataset_name", "Unknown")
         
         if status_text in [DownloadStatus.PENDING, DownloadStatus.DOWNLOADING]:
-            active_downloads.append((download_id, status))
+            active_rows.append({"Dataset": dataset_name, "Progress": status.get("progress", 0.0) * 100})
         elif status_text == DownloadStatus.COMPLETED:
-            completed_downloads.append((download_id, status))
+            completed_rows.append({"Dataset": dataset_name, "Path": status.get("file_path") or ""})
         else:  # FAILED or CANCELLED
-            failed_downloads.append((download_id, status))
-    
-    # Display active downloads
-    if active_downloads:
-        st.sidebar.markdown("**Active Downloads:**")
-        for download_id, status in active_downloads:
-            dataset_name = status.get("dataset_name", "Unknown")
-            progress = status.get("progress", 0.0)
-            
-            # Display progress
-            st.sidebar.markdown(f"{dataset_name}")
-            st.sidebar.progress(progress)
-    
-    # Display completed downloads
-    if completed_downloads:
-        st.sidebar.markdown("**Completed Downloads:**")
-        for download_id, status in completed_downloads:
-            dataset_name = status.get("dataset_name", "Unknown")
-            file_path = status.get("file_path", "")
-            
-            # Display completed download
-            st.sidebar.markdown(f"✅ {dataset_name}")
-    
-    # Display failed downloads
-    if failed_downloads:
-        st.sidebar.markdown("**Failed Downloads:**")
-        for download_id, status in failed_downloads:
-            dataset_name = status.get("dataset_name", "Unknown")
-            status_text = status.get("status", "").capitalize()
-            
-            # Display failed download
-            st.sidebar.markdown(f"❌ {dataset_name} ({status_text})")
+            failed_rows.append({"Dataset": dataset_name, "Status": status_text.capitalize()})
+    
+    # Display each group as a single table, however many downloads there are
+    if active_rows:
+        st.markdown("**Active Downloads:**")
+        st.dataframe(
+            pd.DataFrame(active_rows),
+            column_config={
+                "Progress": st.column_config.ProgressColumn("Progress", format="%.0f%%", min_value=0, max_value=100),
+            },
+            hide_index=True,
+        )
+    
+    if completed_rows:
+        st.markdown("**Completed Downloads:**")
+        st.dataframe(pd.DataFrame(completed_rows), hide_index=True)
+    
+    if failed_rows:
+        st.markdown("**Failed Downloads:**")
+        st.dataframe(pd.DataFrame(failed_rows), hide_index=True)
     
     # Clear all button
-    import time
-    timestamp = int(time.time() * 1000)
-    if st.sidebar.button("Clear All Downloads", key=f"clear_all_{timestamp}"):
+    if st.button("Clear All Downloads", key="clear_all_downloads"):
         st.session_state.downloads = {}
+        st.session_state.downloads_by_dataset = {}
         st.rerun()
@@ -3,11 +3,11 @@ Main Streamlit application for the SearchableDataset.
 """
 import os
 import json
+import dataclasses
 import time
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
 from agents import LLMAgent
 from data_sources import get_connector, CONNECTORS
@@ -26,13 +26,69 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# Number of OpenAI API keys whose agents are kept; each agent holds worker pools and a loop thread
+MAX_AGENTS = 4
+
+@st.cache_resource(show_spinner=False, max_entries=MAX_AGENTS, on_release=LLMAgent.close)
+def _get_agent(openai_api_key: str) -> LLMAgent:
+    """
+    Get the LLM agent for an OpenAI API key, shared by every session using the same key.
+    
+    The data source keys are not part of the agent: the connectors are shared by the
+    whole process and read them from the config. Agents evicted from the cache, e.g.
+    after the key is edited, are closed once their searches in progress finish.
+    
+    Args:
+        openai_api_key: OpenAI API key.
+        
+    Returns:
+        LLMAgent: LLM agent.
+    """
+    return LLMAgent(dataclasses.replace(config.get_llm_config(), api_key=openai_api_key))
+
+@st.cache_data(show_spinner=False)
+def _results_frame(datasets: List[Dict[str, Any]]) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Build the search results table, reused across reruns for the same results.
+    
+    Args:
+        datasets: Datasets from the search results.
+        
+    Returns:
+        Tuple[pd.DataFrame, List[str]]: Datasets as a DataFrame, and the columns to display.
+    """
+    df = pd.DataFrame(datasets)
+    
+    # Select columns to display
+    display_columns = ["name", "source", "description"]
+    if "size" in df.columns:
+        display_columns.append("size")
+    if "license" in df.columns:
+        display_columns.append("license")
+    
+    return df, display_columns
+
+@st.cache_data(show_spinner=False)
+def _index_analysis(analysis: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+    """
+    Index the per-dataset analysis by stripped dataset name.
+    
+    Args:
+        analysis: Analysis of each dataset, keyed by the name the LLM used.
+        
+    Returns:
+        Dict[str, Dict[str, str]]: Analysis keyed by stripped dataset name, keeping the first match.
+    """
+    index = {}
+    for name, data in analysis.items():
+        index.setdefault(name.strip(), data)
+    return index
+
 # Initialize session state
 if "search_results" not in st.session_state:
     st.session_state.search_results = None
 if "selected_dataset" not in st.session_state:
     st.session_state.selected_dataset = None
-if "agent" not in st.session_state:
-    st.session_state.agent = LLMAgent()
 if "search_history" not in st.session_state:
     st.session_state.search_history = []
 
@@ -64,15 +120,19 @@ with st.sidebar:
         os.environ["KAGGLE_USERNAME"] = kaggle_username
         os.environ["KAGGLE_KEY"] = kaggle_key
         os.environ["HUGGINGFACE_API_KEY"] = huggingface_api_key
-        
-        # Reinitialize agent
-        st.session_state.agent = LLMAgent()
+    
+    # Get the agent for the current key
+    st.session_state.agent = _get_agent(openai_api_key)
     
     # Data source selection
     st.subheader("Data Sources")
-    selected_sources = {}
-    for source in CONNECTORS.keys():
-        selected_sources[source] = st.checkbox(source.capitalize(), value=True)
+    data_sources = st.multiselect(
+        "Data Sources",
+        options=list(CONNECTORS.keys()),
+        default=list(CONNECTORS.keys()),
+        format_func=str.capitalize,
+        label_visibility="collapsed",
+    )
     
     # Search history
     if st.session_state.search_history:
@@ -114,9 +174,6 @@ if search_button and search_query:
     # Show loading spinner
     with st.spinner("Searching for datasets..."):
         try:
-            # Get selected data sources
-            data_sources = [source for source, selected in selected_sources.items() if selected]
-            
             # Create context with user preferences
             context = {
                 "user_preferences": {
@@ -130,7 +187,7 @@ if search_button and search_query:
             st.session_state.search_results = results
         except Exception as e:
             st.error(f"Error searching datasets: {e}")
-            log.error(f"Error searching datasets: {e}")
+            log.error("Error searching datasets: %s", e)
 
 # Display search results
 if st.session_state.search_results:
@@ -140,16 +197,13 @@ if st.session_state.search_results:
     st.subheader("Search Analysis")
     col1, col2 = st.columns(2)
     with col1:
-        st.markdown("**Search Terms:**")
-        for term in results["search_terms"]:
-            st.markdown(f"- {term}")
+        terms = "".join(f"\n- {term}" for term in results["search_terms"])
+        st.markdown(f"**Search Terms:**\n{terms}")
     with col2:
-        st.markdown("**Data Sources:**")
-        for source in results["data_sources"]:
-            st.markdown(f"- {source.capitalize()}")
+        sources = "".join(f"\n- {source.capitalize()}" for source in results["data_sources"])
+        st.markdown(f"**Data Sources:**\n{sources}")
     
-    st.markdown("**Explanation:**")
-    st.markdown(results["explanation"])
+    st.markdown(f"**Explanation:**\n\n{results['explanation']}")
     
     # Display dataset analysis
     if "analysis" in results and results["analysis"]:
@@ -157,51 +211,36 @@ if st.session_state.search_results:
         
         # Display ranking
         if "ranking" in results["analysis"] and results["analysis"]["ranking"]:
-            st.markdown("**Ranking:**")
-            for i, item in enumerate(results["analysis"]["ranking"]):
-                st.markdown(f"{i+1}. **{item['name']}** - {item['explanation']}")
+            ranking = "".join(
+                f"\n{i+1}. **{item['name']}** - {item['explanation']}"
+                for i, item in enumerate(results["analysis"]["ranking"])
+            )
+            st.markdown(f"**Ranking:**\n{ranking}")
         
         # Display overall recommendation
         if "overall_recommendation" in results["analysis"] and results["analysis"]["overall_recommendation"]:
-            st.markdown("**Overall Recommendation:**")
-            st.markdown(results["analysis"]["overall_recommendation"])
+            st.markdown(f"**Overall Recommendation:**\n\n{results['analysis']['overall_recommendation']}")
     
     # Display datasets
     st.subheader("Datasets")
     
     # Create a DataFrame for easier display
     if results["datasets"]:
-        df = pd.DataFrame(results["datasets"])
-        
-        # Select columns to display
-        display_columns = ["name", "source", "description"]
-        if "size" in df.columns:
-            display_columns.append("size")
-        if "license" in df.columns:
-            display_columns.append("license")
+        df, display_columns = _results_frame(results["datasets"])
         
         # Display as a table
         st.dataframe(df[display_columns], use_container_width=True)
         
-        # Display datasets with download buttons
+        # Download any dataset from a single picker instead of a button per dataset
         st.subheader("Quick Actions")
-        
-        # Create rows of datasets with download buttons
-        num_cols = 3  # Number of columns in the grid
         datasets_list = results["datasets"]
-        
-        # Create rows of columns
-        for i in range(0, len(datasets_list), num_cols):
-            cols = st.columns(num_cols)
-            
-            # Fill each column with a dataset
-            for j in range(num_cols):
-                idx = i + j
-                if idx < len(datasets_list):
-                    with cols[j]:
-                        dataset_item = datasets_list[idx]
-                        st.markdown(f"**{dataset_item['name']}**")
-                        download_button(dataset_item, key=f"search_result_{idx}")
+        download_index = st.selectbox(
+            "Select a dataset to download",
+            options=range(len(datasets_list)),
+            format_func=lambda x: datasets_list[x]["name"],
+            key="quick_download",
+        )
+        download_button(datasets_list[download_index], key="quick_actions")
         
         # Dataset selection
         selected_index = st.selectbox(
@@ -231,25 +270,28 @@ if st.session_state.selected_dataset:
     tab1, tab2, tab3 = st.tabs(["Overview", "Metadata", "Analysis"])
     
     with tab1:
-        # Display basic information
-        st.markdown(f"**Description:** {dataset['description']}")
-        st.markdown(f"**Source:** {dataset['source']}")
+        # Display basic information as a single element
+        lines = [
+            f"**Description:** {dataset['description']}",
+            f"**Source:** {dataset['source']}",
+        ]
         
         if "url" in dataset and dataset["url"]:
-            st.markdown(f"**URL:** [{dataset['url']}]({dataset['url']})")
+            lines.append(f"**URL:** [{dataset['url']}]({dataset['url']})")
         
         if "size" in dataset and dataset["size"]:
-            st.markdown(f"**Size:** {dataset['size']}")
+            lines.append(f"**Size:** {dataset['size']}")
         
         if "format" in dataset and dataset["format"]:
-            st.markdown(f"**Format:** {dataset['format']}")
+            lines.append(f"**Format:** {dataset['format']}")
         
         if "license" in dataset and dataset["license"]:
-            st.markdown(f"**License:** {dataset['license']}")
+            lines.append(f"**License:** {dataset['license']}")
         
         if "tags" in dataset and dataset["tags"]:
-            st.markdown("**Tags:**")
-            st.write(", ".join(dataset["tags"]))
+            lines.append(f"**Tags:** {', '.join(dataset['tags'])}")
+        
+        st.markdown("\n\n".join(lines))
     
     with tab2:
         # Display metadata
@@ -272,17 +314,15 @@ if st.session_state.selected_dataset:
             analysis = st.session_state.search_results["analysis"]["analysis"]
             
             # Find the analysis for this dataset
-            dataset_analysis = None
-            for name, data in analysis.items():
-                if name.strip() == dataset["name"].strip():
-                    dataset_analysis = data
-                    break
+            dataset_analysis = _index_analysis(analysis).get(dataset["name"].strip())
             
             if dataset_analysis:
-                st.markdown(f"**Relevance:** {dataset_analysis['relevance']}")
-                st.markdown(f"**Strengths:** {dataset_analysis['strengths']}")
-                st.markdown(f"**Limitations:** {dataset_analysis['limitations']}")
-                st.markdown(f"**Recommendation:** {dataset_analysis['recommendation']}")
+                st.markdown(
+                    f"**Relevance:** {dataset_analysis['relevance']}\n\n"
+                    f"**Strengths:** {dataset_analysis['strengths']}\n\n"
+                    f"**Limitations:** {dataset_analysis['limitations']}\n\n"
+                    f"**Recommendation:** {dataset_analysis['recommendation']}"
+                )
             else:
                 st.info("No specific analysis available for this dataset.")
         else:
@@ -3,13 +3,14 @@ Dataset details page for the Streamlit application.
 """
 import os
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, TYPE_CHECKING
 
 from utils import setup_logger
 from app.components import download_button, downloads_sidebar
 
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
 # Set up logger
 log = setup_logger("dataset_details")
 
@@ -20,6 +21,26 @@ st.set_page_config(
     layout="wide",
 )
 
+# Function to build the sample chart once; the figure is never modified, so it is shared
+@st.cache_resource(show_spinner=False)
+def _sample_fig() -> "go.Figure":
+    """
+    Create the sample chart shown in the visualization tab.
+    
+    Returns:
+        go.Figure: Sample bar chart.
+    """
+    # Imported here so plotly is only loaded once the chart is first shown
+    import pandas as pd
+    import plotly.express as px
+    
+    data = {
+        'Category': ['A', 'B', 'C', 'D', 'E'],
+        'Value': [5, 7, 3, 9, 6]
+    }
+    df = pd.DataFrame(data)
+    return px.bar(df, x='Category', y='Value', title="Sample Chart")
+
 # Function to display dataset details
 def display_dataset_details(dataset: Dict[str, Any]) -> None:
     """
@@ -45,24 +66,28 @@ def display_dataset_details(dataset: Dict[str, Any]) -> None:
     with tab1:
         # Display basic information
         st.subheader("Overview")
-        st.markdown(f"**Description:** {dataset['description']}")
-        st.markdown(f"**Source:** {dataset['source']}")
+        lines = [
+            f"**Description:** {dataset['description']}",
+            f"**Source:** {dataset['source']}",
+        ]
         
         if "url" in dataset and dataset["url"]:
-            st.markdown(f"**URL:** [{dataset['url']}]({dataset['url']})")
+            lines.append(f"**URL:** [{dataset['url']}]({dataset['url']})")
         
         if "size" in dataset and dataset["size"]:
-            st.markdown(f"**Size:** {dataset['size']}")
+            lines.append(f"**Size:** {dataset['size']}")
         
         if "format" in dataset and dataset["format"]:
-            st.markdown(f"**Format:** {dataset['format']}")
+            lines.append(f"**Format:** {dataset['format']}")
         
         if "license" in dataset and dataset["license"]:
-            st.markdown(f"**License:** {dataset['license']}")
+            lines.append(f"**License:** {dataset['license']}")
         
         if "tags" in dataset and dataset["tags"]:
-            st.markdown("**Tags:**")
-            st.write(", ".join(dataset["tags"]))
+            lines.append(f"**Tags:** {', '.join(dataset['tags'])}")
+        
+        # Render the overview as a single element
+        st.markdown("\n\n".join(lines))
     
     with tab2:
         # Display metadata
@@ -89,14 +114,8 @@ def display_dataset_details(dataset: Dict[str, Any]) -> None:
         st.markdown("### Sample Visualization")
         st.markdown("This is a placeholder visualization. The actual visualization would depend on the dataset content.")
         
-        # Create a sample chart
-        data = {
-            'Category': ['A', 'B', 'C', 'D', 'E'],
-            'Value': [5, 7, 3, 9, 6]
-        }
-        df = pd.DataFrame(data)
-        fig = px.bar(df, x='Category', y='Value', title="Sample Chart")
-        st.plotly_chart(fig)
+        # Show the sample chart
+        st.plotly_chart(_sample_fig())
 
 # Main function
 def main():
@@ -1,53 +1,50 @@
 """
 Base connector class for dataset sources.
 """
+import functools
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
 from typing import Dict, List, Any, Optional, Callable
 from utils.logger import setup_logger
 from utils import cache
 from utils.downloader import downloader
 
+@dataclass(slots=True)
 class DatasetInfo:
-    """Class representing dataset information."""
+    """
+    Class representing dataset information.
     
-    def __init__(
-        self,
-        id: str,
-        name: str,
-        description: str,
-        source: str,
-        url: Optional[str] = None,
-        size: Optional[str] = None,
-        format: Optional[str] = None,
-        license: Optional[str] = None,
-        tags: Optional[List[str]] = None,
-        metadata: Optional[Dict[str, Any]] = None,
-    ):
-        """
-        Initialize dataset information.
-        
-        Args:
-            id: Unique identifier for the dataset.
-            name: Name of the dataset.
-            description: Description of the dataset.
-            source: Source of the dataset (e.g., "Kaggle", "Hugging Face").
-            url: URL to the dataset.
-            size: Size of the dataset.
-            format: Format of the dataset.
-            license: License of the dataset.
-            tags: Tags associated with the dataset.
-            metadata: Additional metadata.
-        """
-        self.id = id
-        self.name = name
-        self.description = description
-        self.source = source
-        self.url = url
-        self.size = size
-        self.format = format
-        self.license = license
-        self.tags = tags or []
-        self.metadata = metadata or {}
+    Slotted, since search results and the cache hold many instances.
+    
+    Attributes:
+        id: Unique identifier for the dataset.
+        name: Name of the dataset.
+        description: Description of the dataset.
+        source: Source of the dataset (e.g., "Kaggle", "Hugging Face").
+        url: URL to the dataset.
+        size: Size of the dataset.
+        format: Format of the dataset.
+        license: License of the dataset.
+        tags: Tags associated with the dataset.
+        metadata: Additional metadata.
+    """
+    id: str
+    name: str
+    description: str
+    source: str
+    url: Optional[str] = None
+    size: Optional[str] = None
+    format: Optional[str] = None
+    license: Optional[str] = None
+    tags: Optional[List[str]] = field(default_factory=list)
+    metadata: Optional[Dict[str, Any]] = field(default_factory=dict)
+    
+    def __post_init__(self):
+        """Replace missing tags and metadata with empty containers."""
+        if self.tags is None:
+            self.tags = []
+        if self.metadata is None:
+            self.metadata = {}
     
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -107,6 +104,16 @@ class BaseConnector(ABC):
         self.name = name
         self.logger = setup_logger(f"connector.{name}")
     
+    def __repr__(self) -> str:
+        """
+        Represent the connector by its name, so cache keys built from it do not
+        depend on the instance's address.
+        
+        Returns:
+            str: Connector representation.
+        """
+        return f"{type(self).__name__}({self.name!r})"
+    
     @abstractmethod
     def search(self, query: str, limit: int = 10) -> List[DatasetInfo]:
         """
@@ -149,6 +156,7 @@ class BaseConnector(ABC):
         self.logger.info(f"Searching for '{query}' (limit={limit})")
         return self.search(query, limit)
     
+    @cache.cached
     def get_dataset_cached(self, dataset_id: str) -> Optional[DatasetInfo]:
         """
         Get dataset information by ID with caching.
@@ -159,32 +167,11 @@ class BaseConnector(ABC):
         Returns:
             Optional[DatasetInfo]: Dataset information or None if not found.
         """
-        from utils.cache import cache
-        
         self.logger.info(f"Getting dataset '{dataset_id}'")
         
-        # Generate cache key
-        import inspect
-        func_name = inspect.currentframe().f_code.co_name
-        key = cache._get_cache_key(func_name, (self.name, dataset_id), {})
-        
-        # Try to get from cache
-        cached_value = cache.get(key)
-        if cached_value is not None:
-            return cached_value
-        
         try:
-            # Call the actual method
-            result = self.get_dataset(dataset_id)
-            
-            # Cache the result
-            if result is not None:
-                cache.set(key, result)
-            
-            return result
+            return self.get_dataset(dataset_id)
         except Exception as e:
-            # If there's an error, clear the cache for this key
-            cache.clear(key)
             self.logger.error(f"Error getting dataset '{dataset_id}': {e}")
             return None
     
@@ -218,7 +205,7 @@ class BaseConnector(ABC):
             dataset_name=dataset.name,
             source=self.name,
             url=dataset.url,
-            connector_download_func=self._download_dataset_impl,
+            connector_download_func=functools.partial(self._download_dataset_impl, dataset=dataset),
         )
         
         return download_id
@@ -229,6 +216,7 @@ class BaseConnector(ABC):
         target_path: str, 
         progress_callback: Callable[[float], None],
         cancel_event: Any,
+        dataset: Optional[DatasetInfo] = None,
     ) -> None:
         """
         Implementation of dataset download.
@@ -241,6 +229,7 @@ class BaseConnector(ABC):
             target_path: Path to save the dataset.
             progress_callback: Callback function to report progress (0.0 to 1.0).
             cancel_event: Event to check if download should be cancelled.
+            dataset: Dataset information, if already fetched.
         """
         # Default implementation does nothing, as the downloader will use the URL
         # Subclasses can override this method to provide custom download logic
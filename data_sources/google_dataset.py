@@ -1,12 +1,69 @@
 """
 Google Dataset Search connector.
 """
+import os
 import re
+import time
+import hashlib
 import requests
 from typing import List, Optional, Dict, Any
-from bs4 import BeautifulSoup
+from urllib.parse import urljoin
+from lxml import etree, html
 from .base import BaseConnector, DatasetInfo
 
+# Read downloads in 1 MiB chunks, so large files take few loop iterations
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Link text and file extensions that mark a download link on a dataset page
+_DOWNLOAD_KEYWORDS = ("download", "get data", "access data")
+_DOWNLOAD_EXTENSIONS = (".csv", ".json", ".xml", ".zip", ".tar.gz")
+
+def _by_class(name: str, scope: str = ".//*") -> str:
+    """
+    Build an XPath expression matching elements with a CSS class.
+    
+    Args:
+        name: CSS class name.
+        scope: XPath step to filter, descendants of the context node by default.
+        
+    Returns:
+        str: XPath expression.
+    """
+    return f"{scope}[contains(concat(' ', normalize-space(@class), ' '), ' {name} ')]"
+
+def _parse_html(response: requests.Response) -> html.HtmlElement:
+    """
+    Parse an HTML response from its raw bytes, without decoding it to str first.
+    
+    lxml picks the encoding up from a <meta charset> tag; a charset declared in the
+    Content-Type header takes precedence, as it would in a browser.
+    
+    Args:
+        response: HTTP response.
+        
+    Returns:
+        html.HtmlElement: Document root.
+    """
+    encoding = None
+    if "charset" in response.headers.get("content-type", "").lower():
+        encoding = response.encoding
+    if encoding:
+        return html.fromstring(response.content, parser=html.HTMLParser(encoding=encoding))
+    return html.fromstring(response.content)
+
+# Compiled once at import, so pages are walked without re-parsing the selectors
+_CARD_XPATH = etree.XPath(f"({_by_class('dataset-card')})[position() <= $limit]")
+_TITLE_XPATH = etree.XPath(f"({_by_class('dataset-title')})[1]")
+_DESCRIPTION_XPATH = etree.XPath(f"({_by_class('dataset-description')})[1]")
+_INFO_XPATH = etree.XPath(_by_class("dataset-info-item"))
+_INFO_LABEL_XPATH = etree.XPath(f"({_by_class('info-label')})[1]")
+_INFO_VALUE_XPATH = etree.XPath(f"({_by_class('info-value')})[1]")
+_TAG_XPATH = etree.XPath(f"({_by_class('dataset-tags')})[1]{_by_class('dataset-tag', '//*')}")
+_LINK_XPATH = etree.XPath("(.//a)[1]")
+_HREF_XPATH = etree.XPath(".//a[@href]")
+_HEADING_XPATH = etree.XPath("(//h1)[1]")
+_META_DESCRIPTION_XPATH = etree.XPath("//meta[@name='description']/@content")
+
 class GoogleDatasetConnector(BaseConnector):
     """Connector for Google Dataset Search."""
     
@@ -17,6 +74,13 @@ class GoogleDatasetConnector(BaseConnector):
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
         }
+        
+        # Share pooled connections across requests instead of a new TLS handshake per call
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=10)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
     
     def search(self, query: str, limit: int = 10) -> List[DatasetInfo]:
         """
@@ -32,17 +96,14 @@ class GoogleDatasetConnector(BaseConnector):
         try:
             # Prepare search URL
             params = {"query": query}
-            response = requests.get(self.base_url, headers=self.headers, params=params)
+            response = self.session.get(self.base_url, params=params)
             response.raise_for_status()
             
             # Parse HTML response
-            soup = BeautifulSoup(response.text, "lxml")
-            
-            # Extract dataset information
-            dataset_elements = soup.select(".dataset-card")
+            doc = _parse_html(response)
             
-            # Limit results
-            dataset_elements = dataset_elements[:limit]
+            # Extract dataset information, stopping at the result limit
+            dataset_elements = _CARD_XPATH(doc, limit=limit)
             
             # Convert to DatasetInfo objects
             results = []
@@ -71,17 +132,17 @@ class GoogleDatasetConnector(BaseConnector):
         """
         try:
             # For Google Dataset Search, the ID is the URL
-            response = requests.get(dataset_id, headers=self.headers)
+            response = self.session.get(dataset_id)
             response.raise_for_status()
             
             # Parse HTML response
-            soup = BeautifulSoup(response.text, "lxml")
+            doc = _parse_html(response)
             
             # Extract dataset information
             # This is a simplified implementation and may need to be adapted
             # based on the actual structure of the dataset page
-            name = soup.select_one("h1").text.strip()
-            description = soup.select_one("meta[name='description']")["content"]
+            name = _HEADING_XPATH(doc)[0].text_content().strip()
+            description = _META_DESCRIPTION_XPATH(doc)[0]
             
             # Create DatasetInfo
             return DatasetInfo(
@@ -100,42 +161,43 @@ class GoogleDatasetConnector(BaseConnector):
             self.logger.error(f"Error getting Google dataset '{dataset_id}': {e}")
             return None
     
-    def _extract_dataset_info(self, element: Any) -> Optional[DatasetInfo]:
+    def _extract_dataset_info(self, element: html.HtmlElement) -> Optional[DatasetInfo]:
         """
         Extract dataset information from HTML element.
         
         Args:
-            element: BeautifulSoup element.
+            element: Dataset card element.
             
         Returns:
             Optional[DatasetInfo]: Dataset information or None if extraction fails.
         """
         try:
             # Extract basic information
-            title_element = element.select_one(".dataset-title")
-            if not title_element:
+            title_elements = _TITLE_XPATH(element)
+            if not title_elements:
                 return None
+            title_element = title_elements[0]
             
-            name = title_element.text.strip()
+            name = title_element.text_content().strip()
             
             # Extract URL
-            url_element = title_element.find("a")
-            url = url_element["href"] if url_element else None
+            url_elements = _LINK_XPATH(title_element)
+            url = url_elements[0].get("href") if url_elements else None
             
             # Extract description
-            description_element = element.select_one(".dataset-description")
-            description = description_element.text.strip() if description_element else ""
+            description_elements = _DESCRIPTION_XPATH(element)
+            description = description_elements[0].text_content().strip() if description_elements else ""
             
             # Extract additional information
             metadata: Dict[str, Any] = {}
-            info_elements = element.select(".dataset-info-item")
+            info_elements = _INFO_XPATH(element)
             for info in info_elements:
-                label_element = info.select_one(".info-label")
-                value_element = info.select_one(".info-value")
+                label_elements = _INFO_LABEL_XPATH(info)
+                value_elements = _INFO_VALUE_XPATH(info)
                 
-                if label_element and value_element:
-                    label = label_element.text.strip().lower().replace(" ", "_")
-                    value = value_element.text.strip()
+                if label_elements and value_elements:
+                    label = label_elements[0].text_content().strip().lower().replace(" ", "_")
+                    value = value_elements[0].text_content().strip()
                     metadata[label] = value
             
             # Extract size
@@ -148,16 +210,14 @@ class GoogleDatasetConnector(BaseConnector):
             license_value = metadata.get("license", None)
             
             # Extract tags
-            tags = []
-            tags_element = element.select_one(".dataset-tags")
-            if tags_element:
-                tag_elements = tags_element.select(".dataset-tag")
-                tags = [tag.text.strip() for tag in tag_elements]
+            tags = [tag.text_content().strip() for tag in _TAG_XPATH(element)]
             
             # Generate a unique ID if URL is not available
             if not url:
-                # Create a hash of the name and description
-                id_value = f"google_{hash(name + description)}"
+                # Create a hash of the name and description, stable across runs
+                # (unlike hash()) so cached entries keep their IDs
+                digest = hashlib.blake2b((name + description).encode("utf-8"), digest_size=8).hexdigest()
+                id_value = f"google_{digest}"
             else:
                 # Use the URL as the ID
                 id_value = url
@@ -179,48 +239,13 @@ class GoogleDatasetConnector(BaseConnector):
             self.logger.error(f"Error extracting dataset info: {e}")
             return None
     
-    def download_dataset(self, dataset_id: str) -> Optional[str]:
-        """
-        Download a dataset.
-        
-        Args:
-            dataset_id: Dataset ID.
-            
-        Returns:
-            Optional[str]: Download task ID or None if download failed.
-        """
-        # Get dataset information
-        dataset = self.get_dataset_cached(dataset_id)
-        if not dataset:
-            self.logger.error(f"Dataset not found: {dataset_id}")
-            return None
-        
-        # Check if URL is available
-        if not dataset.url:
-            self.logger.error(f"Dataset URL not available: {dataset_id}")
-            return None
-        
-        # Start download
-        self.logger.info(f"Downloading dataset: {dataset.name} ({dataset_id})")
-        
-        # Use the downloader to start the download
-        from utils.downloader import downloader
-        download_id = downloader.download(
-            dataset_id=dataset_id,
-            dataset_name=dataset.name,
-            source=self.name,
-            url=dataset.url,
-            connector_download_func=self._download_dataset_impl,
-        )
-        
-        return download_id
-    
     def _download_dataset_impl(
         self, 
         dataset_id: str, 
         target_path: str, 
         progress_callback: callable,
         cancel_event: Any,
+        dataset: Optional[DatasetInfo] = None,
     ) -> None:
         """
         Implementation of dataset download for Google Dataset Search.
@@ -230,14 +255,11 @@ class GoogleDatasetConnector(BaseConnector):
             target_path: Path to save the dataset.
             progress_callback: Callback function to report progress (0.0 to 1.0).
             cancel_event: Event to check if download should be cancelled.
+            dataset: Dataset information, if already fetched.
         """
-        import os
-        import time
-        import requests
-        
         try:
-            # Get dataset information
-            dataset = self.get_dataset_cached(dataset_id)
+            # Get dataset information, unless download_dataset already passed it in
+            dataset = dataset or self.get_dataset_cached(dataset_id)
             if not dataset:
                 raise ValueError(f"Dataset not found: {dataset_id}")
             
@@ -254,26 +276,22 @@ class GoogleDatasetConnector(BaseConnector):
             
             # Download the dataset page
             self.logger.info(f"Accessing Google dataset page: {dataset_id}")
-            response = requests.get(download_url, headers=self.headers)
+            response = self.session.get(download_url)
             response.raise_for_status()
             
             # Parse HTML response to find download link
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(response.text, "lxml")
+            doc = _parse_html(response)
             
-            # Look for download links
+            # Look for a download link; only the first one is used
             download_links = []
-            for a in soup.find_all("a", href=True):
-                href = a["href"]
-                text = a.text.strip().lower()
+            for a in _HREF_XPATH(doc):
+                href = a.get("href")
+                text = a.text_content().strip().lower()
                 
-                # Check if this looks like a download link
-                if any(keyword in text for keyword in ["download", "get data", "access data"]):
-                    download_links.append(href)
-                
-                # Also check for common file extensions
-                if any(href.endswith(ext) for ext in [".csv", ".json", ".xml", ".zip", ".tar.gz"]):
+                # Check if this looks like a download link, by its text or file extension
+                if any(keyword in text for keyword in _DOWNLOAD_KEYWORDS) or href.endswith(_DOWNLOAD_EXTENSIONS):
                     download_links.append(href)
+                    break
             
             if not download_links:
                 raise ValueError(f"No download links found on the dataset page: {download_url}")
@@ -283,7 +301,6 @@ class GoogleDatasetConnector(BaseConnector):
             
             # If the URL is relative, make it absolute
             if not file_url.startswith("http"):
-                from urllib.parse import urljoin
                 file_url = urljoin(download_url, file_url)
             
             self.logger.info(f"Found download link: {file_url}")
@@ -297,7 +314,7 @@ class GoogleDatasetConnector(BaseConnector):
             
             # Download the file
             self.logger.info(f"Downloading file from: {file_url}")
-            file_response = requests.get(file_url, stream=True, headers=self.headers)
+            file_response = self.session.get(file_url, stream=True)
             file_response.raise_for_status()
             
             # Get file size if available
@@ -307,9 +324,19 @@ class GoogleDatasetConnector(BaseConnector):
             os.makedirs(os.path.dirname(target_path), exist_ok=True)
             
             # Download the file with progress tracking
+            # Writes are already chunk-sized, so skip the file object's own buffer
             downloaded_size = 0
-            with open(target_path, "wb") as f:
-                for chunk in file_response.iter_content(chunk_size=8192):
+            last_reported = 0
+            with open(target_path, "wb", buffering=0) as f:
+                # Reserve the file's blocks up front so the filesystem can lay them out
+                # contiguously; some filesystems do not support it
+                if file_size > 0 and hasattr(os, "posix_fallocate"):
+                    try:
+                        os.posix_fallocate(f.fileno(), 0, file_size)
+                    except OSError:
+                        pass
+                
+                for chunk in file_response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
                     if cancel_event.is_set():
                         # Clean up
                         f.close()
@@ -321,13 +348,19 @@ class GoogleDatasetConnector(BaseConnector):
                         f.write(chunk)
                         downloaded_size += len(chunk)
                         
-                        # Update progress
+                        # Update progress, at most once per percent of the file
                         if file_size > 0:
-                            progress = 0.2 + 0.8 * (downloaded_size / file_size)
-                            progress_callback(min(progress, 0.99))
+                            if downloaded_size - last_reported > file_size // 100:
+                                last_reported = downloaded_size
+                                progress = 0.2 + 0.8 * (downloaded_size / file_size)
+                                progress_callback(min(progress, 0.99))
                         else:
                             # If file size is unknown, update progress based on time
                             progress_callback(min(0.2 + (time.time() % 10) / 100, 0.99))
+                
+                # Drop any reserved space the body did not fill, e.g. when it was
+                # decompressed to a different size than the Content-Length
+                f.truncate(downloaded_size)
             
             # Final progress update
             progress_callback(1.0)
@@ -1,12 +1,96 @@
 """
 Hugging Face dataset connector.
 """
-from typing import List, Optional, Dict, Any
+import os
+import uuid
+import shutil
+import zipfile
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Callable
 import requests
-from huggingface_hub import HfApi
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from huggingface_hub import snapshot_download
+from huggingface_hub.utils import tqdm as hf_tqdm
 from .base import BaseConnector, DatasetInfo
 from utils import config
 
+# orjson parses the Hub's JSON responses faster; json is the fallback
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+# Dataset fields that DatasetInfo holds itself, so they are left out of the metadata
+_DATASET_INFO_KEYS = frozenset({"id", "name", "description", "url", "size", "license", "tags"})
+
+class _DownloadCancelled(Exception):
+    """Raised from a progress update to stop a cancelled snapshot download."""
+
+class _ProgressBar(hf_tqdm):
+    """
+    Progress bar that forwards snapshot download progress to a download task.
+    
+    snapshot_download may create several bars from the class: one counting the files
+    fetched and, in recent versions, byte bars whose totals grow as each file starts.
+    Only the file-count bar reports progress, so the reported value never jumps back;
+    every bar still checks for cancellation.
+    """
+    
+    progress_callback: Callable[[float], None]
+    cancel_event: Any
+    
+    def __init__(self, *args: Any, **kwargs: Any):
+        """
+        Initialize the progress bar, noting whether it counts files or bytes.
+        
+        Args:
+            *args: Positional arguments for tqdm.
+            **kwargs: Keyword arguments for tqdm.
+        """
+        # Read before tqdm runs, since a disabled bar does not keep its unit
+        self._reports = kwargs.get("unit", "it") != "B"
+        super().__init__(*args, **kwargs)
+    
+    def update(self, n: Optional[float] = 1) -> Optional[bool]:
+        """
+        Advance the progress bar and report the progress of the download.
+        
+        Args:
+            n: Increment to add.
+            
+        Returns:
+            Optional[bool]: Whether the bar was redrawn.
+            
+        Raises:
+            _DownloadCancelled: If the download has been cancelled.
+        """
+        if self.cancel_event.is_set():
+            raise _DownloadCancelled()
+        
+        # Count the progress here as well, since a disabled bar does not track it
+        self._done = getattr(self, "_done", 0) + (n or 0)
+        if self._reports and self.total:
+            self.progress_callback(min(0.1 + 0.8 * (self._done / self.total), 0.9))
+        
+        return super().update(n)
+
+def _progress_bar_class(progress_callback: Callable[[float], None], cancel_event: Any) -> type:
+    """
+    Create a progress bar class bound to one download, for snapshot_download's tqdm_class.
+    
+    Args:
+        progress_callback: Callback function to report progress (0.0 to 1.0).
+        cancel_event: Event to check if download should be cancelled.
+        
+    Returns:
+        type: _ProgressBar subclass.
+    """
+    return type("_TaskProgressBar", (_ProgressBar,), {
+        "progress_callback": staticmethod(progress_callback),
+        "cancel_event": cancel_event,
+    })
+
 class HuggingFaceConnector(BaseConnector):
     """Connector for Hugging Face datasets."""
     
@@ -17,8 +101,15 @@ class HuggingFaceConnector(BaseConnector):
         # Set up API
         hf_config = config.get_huggingface_config()
         self.api_key = hf_config["api_key"]
-        self.api = HfApi(token=self.api_key)
         self.base_url = "https://huggingface.co/api/datasets"
+        
+        # Keep connections to the Hub alive across searches, lookups and downloads,
+        # retrying rate limits and transient server errors
+        self.session = requests.Session()
+        retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        self.session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retries))
+        if self.api_key:
+            self.session.headers["Authorization"] = f"Bearer {self.api_key}"
     
     def search(self, query: str, limit: int = 10) -> List[DatasetInfo]:
         """
@@ -33,21 +124,15 @@ class HuggingFaceConnector(BaseConnector):
         """
         try:
             # Search for datasets
-            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
             params = {"search": query, "limit": limit}
-            response = requests.get(self.base_url, headers=headers, params=params)
+            response = self.session.get(self.base_url, params=params)
             response.raise_for_status()
             
             # Parse response
-            datasets = response.json()
+            datasets = _json.loads(response.content)
             
             # Convert to DatasetInfo objects
-            results = []
-            for dataset in datasets:
-                dataset_info = self._convert_to_dataset_info(dataset)
-                results.append(dataset_info)
-            
-            return results
+            return [self._convert_to_dataset_info(dataset) for dataset in datasets]
         except Exception as e:
             self.logger.error(f"Error searching Hugging Face datasets: {e}")
             return []
@@ -64,12 +149,11 @@ class HuggingFaceConnector(BaseConnector):
         """
         try:
             # Get dataset information
-            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
-            response = requests.get(f"{self.base_url}/{dataset_id}", headers=headers)
+            response = self.session.get(f"{self.base_url}/{dataset_id}")
             response.raise_for_status()
             
             # Parse response
-            dataset = response.json()
+            dataset = _json.loads(response.content)
             
             # Convert to DatasetInfo
             return self._convert_to_dataset_info(dataset)
@@ -88,10 +172,9 @@ class HuggingFaceConnector(BaseConnector):
             DatasetInfo: Dataset information.
         """
         # Extract metadata
-        metadata: Dict[str, Any] = {}
-        for key, value in dataset.items():
-            if key not in ["id", "name", "description", "url", "size", "license", "tags"]:
-                metadata[key] = value
+        metadata: Dict[str, Any] = {
+            key: value for key, value in dataset.items() if key not in _DATASET_INFO_KEYS
+        }
         
         # Create DatasetInfo
         return DatasetInfo(
@@ -107,66 +190,31 @@ class HuggingFaceConnector(BaseConnector):
             metadata=metadata,
         )
     
-    def download_dataset(self, dataset_id: str) -> Optional[str]:
-        """
-        Download a dataset.
-        
-        Args:
-            dataset_id: Dataset ID.
-            
-        Returns:
-            Optional[str]: Download task ID or None if download failed.
-        """
-        # Get dataset information
-        dataset = self.get_dataset_cached(dataset_id)
-        if not dataset:
-            self.logger.error(f"Dataset not found: {dataset_id}")
-            return None
-        
-        # Check if URL is available
-        if not dataset.url:
-            self.logger.error(f"Dataset URL not available: {dataset_id}")
-            return None
-        
-        # Start download
-        self.logger.info(f"Downloading dataset: {dataset.name} ({dataset_id})")
-        
-        # Use the downloader to start the download
-        from utils.downloader import downloader
-        download_id = downloader.download(
-            dataset_id=dataset_id,
-            dataset_name=dataset.name,
-            source=self.name,
-            url=dataset.url,
-            connector_download_func=self._download_dataset_impl,
-        )
-        
-        return download_id
-    
     def _download_dataset_impl(
         self, 
         dataset_id: str, 
         target_path: str, 
         progress_callback: callable,
         cancel_event: Any,
+        dataset: Optional[DatasetInfo] = None,
     ) -> None:
         """
         Implementation of dataset download for Hugging Face.
         
+        The dataset repository is fetched with snapshot_download, which downloads its
+        files in parallel, and packed into a zip archive at the target path.
+        
         Args:
             dataset_id: Dataset ID.
             target_path: Path to save the dataset.
             progress_callback: Callback function to report progress (0.0 to 1.0).
             cancel_event: Event to check if download should be cancelled.
+            dataset: Dataset information, if already fetched.
         """
-        import os
-        import time
-        import requests
-        from tqdm import tqdm
-        
+        temp_dir = None
         try:
-            # Get dataset information
-            dataset = self.get_dataset_cached(dataset_id)
+            # Get dataset information, unless download_dataset already passed it in
+            dataset = dataset or self.get_dataset_cached(dataset_id)
             if not dataset:
                 raise ValueError(f"Dataset not found: {dataset_id}")
             
@@ -177,54 +225,45 @@ class HuggingFaceConnector(BaseConnector):
             if cancel_event.is_set():
                 return
             
-            # Get download URL
-            download_url = f"https://huggingface.co/datasets/{dataset_id}/resolve/main/data/dataset.zip"
-            
-            # Download the dataset
+            # Download the dataset repository next to the target, so it can be packed into place
             self.logger.info(f"Downloading Hugging Face dataset: {dataset_id}")
+            temp_dir = os.path.join(os.path.dirname(target_path), f".tmp_{uuid.uuid4().hex}")
+            snapshot_download(
+                repo_id=dataset_id,
+                repo_type="dataset",
+                local_dir=temp_dir,
+                max_workers=8,
+                token=self.api_key or None,
+                tqdm_class=_progress_bar_class(progress_callback, cancel_event),
+            )
             
-            # Make a request to get the file size
-            response = requests.head(download_url, headers={"Authorization": f"Bearer {self.api_key}"} if self.api_key else {})
-            file_size = int(response.headers.get("content-length", 0))
-            
-            # Download with progress tracking
-            response = requests.get(download_url, stream=True, headers={"Authorization": f"Bearer {self.api_key}"} if self.api_key else {})
-            response.raise_for_status()
+            # Check if cancelled
+            if cancel_event.is_set():
+                return
             
-            # Create parent directory if it doesn't exist
-            os.makedirs(os.path.dirname(target_path), exist_ok=True)
-            
-            # Download the file
-            downloaded_size = 0
-            with open(target_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if cancel_event.is_set():
-                        # Clean up
-                        f.close()
-                        if os.path.exists(target_path):
-                            os.remove(target_path)
-                        return
-                    
-                    if chunk:
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
-                        
-                        # Update progress
-                        if file_size > 0:
-                            progress = 0.1 + 0.9 * (downloaded_size / file_size)
-                            progress_callback(min(progress, 0.99))
-                        else:
-                            # If file size is unknown, update progress based on time
-                            progress_callback(min(0.1 + (time.time() % 10) / 100, 0.99))
+            # Pack the files into the target archive. Hub datasets are mostly stored in
+            # compressed formats, so they are stored as they are rather than deflated again
+            with zipfile.ZipFile(target_path, "w", zipfile.ZIP_STORED) as zipf:
+                for root, dirs, files in os.walk(temp_dir):
+                    # Skip the download metadata snapshot_download keeps in the directory
+                    dirs[:] = [d for d in dirs if d != ".cache"]
+                    for file in files:
+                        file_path = os.path.join(root, file)
+                        zipf.write(file_path, arcname=os.path.relpath(file_path, temp_dir))
             
             # Final progress update
             progress_callback(1.0)
             
             self.logger.info(f"Hugging Face dataset downloaded: {dataset_id} -> {target_path}")
             
+        except _DownloadCancelled:
+            # Clean up any partial downloads
+            Path(target_path).unlink(missing_ok=True)
         except Exception as e:
             self.logger.error(f"Error downloading Hugging Face dataset '{dataset_id}': {e}")
             # Clean up any partial downloads
-            if os.path.exists(target_path):
-                os.remove(target_path)
+            Path(target_path).unlink(missing_ok=True)
             raise
+        finally:
+            if temp_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
@@ -2,6 +2,10 @@
 Kaggle dataset connector.
 """
 import os
+import uuid
+import functools
+import shutil
+import zipfile
 import threading
 from typing import List, Optional, Dict, Any, Callable
 import kaggle
@@ -9,6 +13,21 @@ from .base import BaseConnector, DatasetInfo
 from utils import config
 from utils.logger import setup_logger
 
+# Files that gain nothing from being deflated again when zipping a download
+_COMPRESSED_EXTENSIONS = (".gz", ".zip", ".parquet", ".xz", ".zst", ".bz2", ".7z")
+
+# Dataset fields that DatasetInfo holds itself, so they are left out of the metadata
+_DATASET_INFO_KEYS = frozenset({"id", "name", "description", "url", "size", "license", "tags"})
+
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+@functools.lru_cache(maxsize=8192)
+def _format_size_cached(size_bytes: int) -> str:
+    """Format a whole number of bytes; see KaggleConnector._format_size."""
+    # Each unit is 2**10 times the previous, so the bit length picks it directly
+    unit_index = min(max(size_bytes.bit_length() - 1, 0) // 10, len(_SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (unit_index * 10)):.2f} {_SIZE_UNITS[unit_index]}"
+
 class KaggleConnector(BaseConnector):
     """Connector for Kaggle datasets."""
     
@@ -18,8 +37,9 @@ class KaggleConnector(BaseConnector):
         
         # Set Kaggle credentials from config
         kaggle_config = config.get_kaggle_config()
-        os.environ["KAGGLE_USERNAME"] = kaggle_config["username"]
-        os.environ["KAGGLE_KEY"] = kaggle_config["key"]
+        for name, value in (("KAGGLE_USERNAME", kaggle_config["username"]), ("KAGGLE_KEY", kaggle_config["key"])):
+            if os.environ.get(name) != value:
+                os.environ[name] = value
     
     def search(self, query: str, limit: int = 10) -> List[DatasetInfo]:
         """
@@ -68,15 +88,12 @@ class KaggleConnector(BaseConnector):
                 
             username, dataset_name = parts
             
-            # Search for datasets by this user
-            datasets = kaggle.api.dataset_list(user=username)
+            # Search this user's datasets for the name, so the server narrows the list
+            # instead of returning the user's whole catalog
+            datasets = kaggle.api.dataset_list(user=username, search=dataset_name)
             
             # Find the specific dataset
-            dataset = None
-            for d in datasets:
-                if d.ref == dataset_id:
-                    dataset = d
-                    break
+            dataset = next((d for d in datasets if d.ref == dataset_id), None)
             
             if not dataset:
                 self.logger.error(f"Dataset not found: {dataset_id}")
@@ -99,10 +116,9 @@ class KaggleConnector(BaseConnector):
             DatasetInfo: Dataset information.
         """
         # Extract metadata
-        metadata: Dict[str, Any] = {}
-        for key, value in dataset.__dict__.items():
-            if key not in ["id", "name", "description", "url", "size", "license", "tags"]:
-                metadata[key] = value
+        metadata: Dict[str, Any] = {
+            key: value for key, value in dataset.__dict__.items() if key not in _DATASET_INFO_KEYS
+        }
         
         # Get size safely
         size = None
@@ -120,8 +136,8 @@ class KaggleConnector(BaseConnector):
             url=f"https://www.kaggle.com/datasets/{dataset.ref}",
             size=self._format_size(size),
             format=None,  # Kaggle API doesn't provide format information
-            license=dataset.licenseName if hasattr(dataset, "licenseName") else "Unknown",
-            tags=[tag.name for tag in dataset.tags] if hasattr(dataset, "tags") else [],
+            license=getattr(dataset, "licenseName", "Unknown"),
+            tags=[tag.name for tag in getattr(dataset, "tags", ())],
             metadata=metadata,
         )
     
@@ -138,52 +154,7 @@ class KaggleConnector(BaseConnector):
         if size_bytes is None:
             return "Unknown"
         
-        # Convert to appropriate unit
-        units = ["B", "KB", "MB", "GB", "TB"]
-        size = float(size_bytes)
-        unit_index = 0
-        
-        while size >= 1024 and unit_index < len(units) - 1:
-            size /= 1024
-            unit_index += 1
-        
-        return f"{size:.2f} {units[unit_index]}"
-    
-    def download_dataset(self, dataset_id: str) -> Optional[str]:
-        """
-        Download a dataset.
-        
-        Args:
-            dataset_id: Dataset ID.
-            
-        Returns:
-            Optional[str]: Download task ID or None if download failed.
-        """
-        # Get dataset information
-        dataset = self.get_dataset_cached(dataset_id)
-        if not dataset:
-            self.logger.error(f"Dataset not found: {dataset_id}")
-            return None
-        
-        # Check if URL is available
-        if not dataset.url:
-            self.logger.error(f"Dataset URL not available: {dataset_id}")
-            return None
-        
-        # Start download
-        self.logger.info(f"Downloading dataset: {dataset.name} ({dataset_id})")
-        
-        # Use the downloader to start the download
-        from utils.downloader import downloader
-        download_id = downloader.download(
-            dataset_id=dataset_id,
-            dataset_name=dataset.name,
-            source=self.name,
-            url=dataset.url,
-            connector_download_func=self._download_dataset_impl,
-        )
-        
-        return download_id
+        return _format_size_cached(int(size_bytes))
     
     def _download_dataset_impl(
         self, 
@@ -191,6 +162,7 @@ class KaggleConnector(BaseConnector):
         target_path: str, 
         progress_callback: Callable[[float], None],
         cancel_event: threading.Event,
+        dataset: Optional[DatasetInfo] = None,
     ) -> None:
         """
         Implementation of dataset download using Kaggle API.
@@ -200,14 +172,17 @@ class KaggleConnector(BaseConnector):
             target_path: Path to save the dataset.
             progress_callback: Callback function to report progress (0.0 to 1.0).
             cancel_event: Event to check if download should be cancelled.
+            dataset: Dataset information, if already fetched.
         """
+        temp_dir = None
         try:
             # Extract the target directory and filename
             target_dir = os.path.dirname(target_path)
             filename = os.path.basename(target_path)
             
-            # Create a temporary directory for the download
-            temp_dir = os.path.join(target_dir, f"temp_{dataset_id.replace('/', '_')}")
+            # Create a temporary directory for the download next to the target, so the
+            # result can be renamed into place rather than copied
+            temp_dir = os.path.join(target_dir, f".tmp_{uuid.uuid4().hex}")
             os.makedirs(temp_dir, exist_ok=True)
             
             # Set initial progress
@@ -217,12 +192,14 @@ class KaggleConnector(BaseConnector):
             if cancel_event.is_set():
                 return
             
-            # Download the dataset
+            # Download the dataset. Kaggle serves datasets as a zip archive, so when the
+            # target is a zip file keep the archive as it is rather than unzipping it
+            # only to zip the files again
             self.logger.info(f"Downloading Kaggle dataset: {dataset_id}")
             kaggle.api.dataset_download_files(
                 dataset_id,
                 path=temp_dir,
-                unzip=True,
+                unzip=not target_path.lower().endswith(".zip"),
             )
             
             # Update progress
@@ -231,34 +208,30 @@ class KaggleConnector(BaseConnector):
             # Check if cancelled
             if cancel_event.is_set():
                 # Clean up
-                if os.path.exists(temp_dir):
-                    import shutil
-                    shutil.rmtree(temp_dir)
+                shutil.rmtree(temp_dir, ignore_errors=True)
                 return
             
             # Find the downloaded files
-            downloaded_files = os.listdir(temp_dir)
+            with os.scandir(temp_dir) as entries:
+                downloaded_files = [entry.path for entry in entries]
             
             if not downloaded_files:
                 raise Exception(f"No files found in downloaded dataset: {dataset_id}")
             
-            # If there's only one file, move it to the target path
+            # If there's only one file (or the kept archive), move it to the target path
             if len(downloaded_files) == 1:
-                source_file = os.path.join(temp_dir, downloaded_files[0])
-                import shutil
-                shutil.move(source_file, target_path)
+                os.replace(downloaded_files[0], target_path)
             else:
                 # If there are multiple files, create a zip file
-                import zipfile
-                with zipfile.ZipFile(target_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for file in downloaded_files:
-                        file_path = os.path.join(temp_dir, file)
-                        # Add the file to the zip
-                        zipf.write(file_path, arcname=file)
+                # Fast compression: most of the ratio at a fraction of the CPU
+                with zipfile.ZipFile(target_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zipf:
+                    for file_path in downloaded_files:
+                        # Add the file to the zip, storing already compressed files as they are
+                        compress_type = zipfile.ZIP_STORED if file_path.lower().endswith(_COMPRESSED_EXTENSIONS) else None
+                        zipf.write(file_path, arcname=os.path.basename(file_path), compress_type=compress_type)
             
             # Clean up the temporary directory
-            import shutil
-            shutil.rmtree(temp_dir)
+            shutil.rmtree(temp_dir, ignore_errors=True)
             
             # Final progress update
             progress_callback(1.0)
@@ -268,7 +241,6 @@ class KaggleConnector(BaseConnector):
         except Exception as e:
             self.logger.error(f"Error downloading Kaggle dataset '{dataset_id}': {e}")
             # Clean up any temporary files
-            if 'temp_dir' in locals() and os.path.exists(temp_dir):
-                import shutil
-                shutil.rmtree(temp_dir)
+            if temp_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
             raise
@@ -5,7 +5,6 @@ Script to run the SearchableDataset application.
 import os
 import sys
 import argparse
-import subprocess
 from typing import List, Optional
 
 # Add the current directory to the Python path
@@ -18,9 +17,11 @@ def run_streamlit(args: List[str]) -> None:
     Args:
         args: Command-line arguments.
     """
-    # Run the Streamlit application
-    cmd = ["streamlit", "run", "app/main.py"] + args
-    subprocess.run(cmd)
+    # Run the Streamlit CLI in this process rather than starting another interpreter
+    from streamlit.web import cli as stcli
+    
+    sys.argv = ["streamlit", "run", "app/main.py"] + args
+    sys.exit(stcli.main())
 
 def run_tests(args: List[str]) -> None:
     """
@@ -29,9 +30,10 @@ def run_tests(args: List[str]) -> None:
     Args:
         args: Command-line arguments.
     """
-    # Run the tests
-    cmd = ["pytest"] + args
-    subprocess.run(cmd)
+    # Run the tests in this process rather than starting another interpreter
+    import pytest
+    
+    sys.exit(pytest.main(args))
 
 def main() -> None:
     """Main function."""
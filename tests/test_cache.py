@@ -0,0 +1,198 @@
+"""
+Tests for the cache.
+"""
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from typing import Any, List
+
+from utils.cache import Cache, CACHE_EXTENSION
+from data_sources import DatasetInfo
+
+class TestCache(unittest.TestCase):
+    """Tests for the cache."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = Cache(self.cache_dir, memory_size=2)
+        
+        # Make sure the cached decorator does not skip the cache
+        self.debug_patcher = patch('utils.cache.config.DEBUG', False)
+        self.debug_patcher.start()
+    
+    def tearDown(self):
+        """Tear down test fixtures."""
+        self.debug_patcher.stop()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+    
+    def test_set_get(self):
+        """Test reading values back, from memory and from the cache files."""
+        dataset = DatasetInfo(id="d", name="Dataset", description="", source="Kaggle")
+        self.cache.set("text", "hello")
+        self.cache.set("datasets", [dataset])
+        
+        # A new cache has nothing in memory, so it reads the files
+        cache = Cache(self.cache_dir)
+        self.assertEqual(cache.get("text"), "hello")
+        self.assertEqual(cache.get("datasets"), [dataset])
+        self.assertIsNone(cache.get("missing"))
+        
+        # Only the entries themselves are left on disk, no temporary files
+        self.assertEqual(
+            sorted(os.listdir(self.cache_dir)),
+            [f"datasets{CACHE_EXTENSION}", f"text{CACHE_EXTENSION}"],
+        )
+    
+    def test_memory_eviction(self):
+        """Test that the least recently used entries are evicted from memory."""
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+        
+        self.assertEqual(list(self.cache._mem), ["a", "c"])
+        
+        # Evicted entries are still read from disk
+        self.assertEqual(self.cache.get("b"), 2)
+    
+    def test_expiry(self):
+        """Test that expired entries are not returned, from memory or disk."""
+        self.cache.set("a", 1)
+        
+        with patch('utils.cache.time.time', return_value=time.time() + self.cache.expiry + 1):
+            self.assertIsNone(self.cache.get("a"))
+            self.assertNotIn("a", self.cache._mem)
+            
+            # The file has expired as well
+            self.assertIsNone(self.cache.get("a"))
+    
+    def test_ttl(self):
+        """Test that entries with their own TTL expire after it, from memory or disk."""
+        self.cache.set("short", 1, ttl=10)
+        self.cache.set("long", 2, ttl=self.cache.expiry * 2)
+        
+        with patch('utils.cache.time.time', return_value=time.time() + 11):
+            self.assertIsNone(self.cache.get("short"))
+            self.assertIsNone(Cache(self.cache_dir).get("short"))
+        
+        with patch('utils.cache.time.time', return_value=time.time() + self.cache.expiry + 1):
+            self.assertEqual(self.cache.get("long"), 2)
+            self.assertEqual(Cache(self.cache_dir).get("long"), 2)
+    
+    def test_clear(self):
+        """Test clearing one entry and the whole cache."""
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        
+        self.cache.clear("a")
+        self.cache.clear("missing")
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.get("b"), 2)
+        
+        self.cache.clear()
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+    
+    def test_cached(self):
+        """Test caching function results, with hashable and unhashable arguments."""
+        calls: List[Any] = []
+        
+        @self.cache.cached
+        def func(value, limit=10):
+            calls.append(value)
+            return [value, limit]
+        
+        with patch.object(self.cache, "_get_cache_key", wraps=self.cache._get_cache_key) as get_key:
+            self.assertEqual(func("x"), ["x", 10])
+            self.assertEqual(func("x"), ["x", 10])
+            self.assertEqual(func("x", limit=5), ["x", 5])
+            
+            # Repeat calls with hashable arguments reuse the memoized key
+            self.assertEqual(get_key.call_count, 2)
+            
+            # Unhashable arguments skip the key memo but are still cached
+            self.assertEqual(func(["y"]), [["y"], 10])
+            self.assertEqual(func(["y"]), [["y"], 10])
+            self.assertEqual(get_key.call_count, 4)
+        
+        self.assertEqual(calls, ["x", "x", ["y"]])
+    
+    def test_cached_coalesces_concurrent_calls(self):
+        """Test that concurrent identical calls share the first call's result."""
+        started = threading.Event()
+        release = threading.Event()
+        calls: List[str] = []
+        
+        @self.cache.cached
+        def func(value):
+            calls.append(value)
+            started.set()
+            release.wait(5)
+            return [value]
+        
+        results: List[Any] = []
+        leader = threading.Thread(target=lambda: results.append(func("x")))
+        leader.start()
+        self.assertTrue(started.wait(5))
+        
+        followers = [threading.Thread(target=lambda: results.append(func("x"))) for _ in range(3)]
+        for follower in followers:
+            follower.start()
+        
+        # Give the followers time to find the call in progress
+        time.sleep(0.1)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+        
+        self.assertEqual(calls, ["x"])
+        self.assertEqual(results, [["x"]] * 4)
+        self.assertEqual(self.cache._calls, {})
+    
+    def test_cached_follower_retries_after_failure(self):
+        """Test that waiting callers make the call themselves if the first call fails."""
+        started = threading.Event()
+        release = threading.Event()
+        calls: List[str] = []
+        
+        @self.cache.cached
+        def func(value):
+            calls.append(value)
+            if len(calls) == 1:
+                started.set()
+                release.wait(5)
+                raise ValueError("first call fails")
+            return [value]
+        
+        errors: List[Exception] = []
+        results: List[Any] = []
+        
+        def leader_call():
+            try:
+                func("x")
+            except ValueError as e:
+                errors.append(e)
+        
+        leader = threading.Thread(target=leader_call)
+        leader.start()
+        self.assertTrue(started.wait(5))
+        
+        follower = threading.Thread(target=lambda: results.append(func("x")))
+        follower.start()
+        time.sleep(0.1)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+        
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(results, [["x"]])
+        self.assertEqual(calls, ["x", "x"])
+        self.assertEqual(self.cache._calls, {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,6 +4,7 @@ Tests for the data sources.
 import unittest
 from unittest.mock import patch, MagicMock
 import json
+from types import SimpleNamespace
 from typing import Dict, List, Any
 
 from data_sources import (
@@ -105,6 +106,11 @@ class TestConnectors(unittest.TestCase):
 class TestKaggleConnector(unittest.TestCase):
     """Tests for the Kaggle connector."""
     
+    @classmethod
+    def setUpClass(cls):
+        """Create the connector once, shared by every test."""
+        cls.connector = KaggleConnector()
+    
     @patch('data_sources.kaggle.kaggle.api.dataset_list')
     def test_search(self, mock_dataset_list):
         """Test searching for datasets."""
@@ -115,16 +121,14 @@ class TestKaggleConnector(unittest.TestCase):
         mock_dataset.subtitle = "Test description"
         mock_dataset.size = 1024 * 1024  # 1 MB
         mock_dataset.licenseName = "MIT"
-        mock_dataset.tags = [MagicMock(name="tag1"), MagicMock(name="tag2")]
+        # MagicMock(name=...) only names the mock, so the tag names are set as attributes
+        mock_dataset.tags = [SimpleNamespace(name="tag1"), SimpleNamespace(name="tag2")]
         
         # Set up the mock
         mock_dataset_list.return_value = [mock_dataset]
         
-        # Create the connector
-        connector = KaggleConnector()
-        
         # Search for datasets
-        results = connector.search("test query")
+        results = self.connector.search("test query")
         
         # Check the results
         self.assertEqual(len(results), 1)
@@ -140,12 +144,17 @@ class TestKaggleConnector(unittest.TestCase):
 class TestHuggingFaceConnector(unittest.TestCase):
     """Tests for the Hugging Face connector."""
     
-    @patch('data_sources.huggingface.requests.get')
+    @classmethod
+    def setUpClass(cls):
+        """Create the connector once, shared by every test."""
+        cls.connector = HuggingFaceConnector()
+    
+    @patch('data_sources.huggingface.requests.Session.get')
     def test_search(self, mock_get):
         """Test searching for datasets."""
         # Create mock response
         mock_response = MagicMock()
-        mock_response.json.return_value = [
+        mock_response.content = json.dumps([
             {
                 "id": "test_dataset",
                 "name": "Test Dataset",
@@ -154,14 +163,11 @@ class TestHuggingFaceConnector(unittest.TestCase):
                 "license": "MIT",
                 "size_categories": ["10MB-100MB"],
             }
-        ]
+        ]).encode()
         mock_get.return_value = mock_response
         
-        # Create the connector
-        connector = HuggingFaceConnector()
-        
         # Search for datasets
-        results = connector.search("test query")
+        results = self.connector.search("test query")
         
         # Check the results
         self.assertEqual(len(results), 1)
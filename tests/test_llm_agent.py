@@ -1,38 +1,51 @@
 """
 Tests for the LLM agent.
 """
+import time
+import asyncio
+import shutil
+import tempfile
+import threading
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import json
 from typing import Dict, List, Any
 
 from agents import LLMAgent, PromptTemplates, ResponseProcessor
 from data_sources import DatasetInfo
+from utils.cache import Cache
 
 class TestLLMAgent(unittest.TestCase):
     """Tests for the LLM agent."""
     
     def setUp(self):
         """Set up test fixtures."""
-        # Mock the LLMAgent to avoid actual API calls
-        self.patcher = patch('agents.llm_agent.ChatOpenAI')
-        self.mock_chat = self.patcher.start()
+        # Mock the OpenAI client to avoid actual API calls
+        self.patcher = patch('agents.llm_agent.openai.AsyncOpenAI')
+        self.mock_client = self.patcher.start()
+        
+        # Bypass the LLM response cache so every test sees the mock response
+        self.cache_patcher = patch('agents.llm_agent.cache')
+        self.cache_patcher.start().get.return_value = None
         
         # Create a mock response
         mock_response = MagicMock()
-        mock_response.content = """
+        mock_response.choices[0].message.content = """
         Search Terms: machine learning, neural networks, deep learning
         Explanation: These terms are related to artificial intelligence and would help find relevant datasets.
         Data Sources: kaggle, huggingface
         """
-        self.mock_chat.return_value.return_value = [mock_response]
+        self.mock_client.return_value.chat.completions.create = AsyncMock(return_value=mock_response)
+        self.mock_client.return_value.close = AsyncMock()
         
         # Create the agent
         self.agent = LLMAgent()
     
     def tearDown(self):
         """Tear down test fixtures."""
+        self.agent.close()
         self.patcher.stop()
+        self.cache_patcher.stop()
     
     def test_generate_search_terms(self):
         """Test generating search terms."""
@@ -92,10 +105,10 @@ class TestLLMAgent(unittest.TestCase):
         
         # Check the results
         self.assertEqual(len(results), 2)
-        self.assertEqual(results[0]["id"], "dataset1")
-        self.assertEqual(results[0]["name"], "Dataset 1")
-        self.assertEqual(results[1]["id"], "dataset2")
-        self.assertEqual(results[1]["name"], "Dataset 2")
+        self.assertEqual(results[0].id, "dataset1")
+        self.assertEqual(results[0].name, "Dataset 1")
+        self.assertEqual(results[1].id, "dataset2")
+        self.assertEqual(results[1].name, "Dataset 2")
     
     def test_process_search_terms(self):
         """Test processing search terms."""
@@ -121,6 +134,32 @@ class TestLLMAgent(unittest.TestCase):
         
         self.assertIn("artificial intelligence", explanation)
     
+    def test_process_search_terms_stream(self):
+        """Test processing search terms from a streamed response."""
+        response = 'Search Terms: ["machine learning", "neural networks"]\nExplanation: AI datasets\nData Sources: ["kaggle", "huggingface"]'
+        
+        async def chunks():
+            # Split the response into small pieces, as an LLM stream would
+            for i in range(0, len(response), 4):
+                yield response[i:i + 4]
+        
+        async def collect():
+            return [event async for event in ResponseProcessor.process_search_terms_stream(chunks())]
+        
+        events = asyncio.run(collect())
+        
+        # Check the results
+        self.assertEqual(events[:4], [
+            ("search_terms", "machine learning"),
+            ("search_terms", "neural networks"),
+            ("data_sources", "kaggle"),
+            ("data_sources", "huggingface"),
+        ])
+        self.assertEqual(events[-1][0], "result")
+        search_terms, data_sources, explanation = events[-1][1]
+        self.assertEqual(search_terms, ("machine learning", "neural networks"))
+        self.assertEqual(data_sources, ("kaggle", "huggingface"))
+    
     def test_process_dataset_analysis(self):
         """Test processing dataset analysis."""
         # Sample response
@@ -159,6 +198,77 @@ class TestLLMAgent(unittest.TestCase):
         self.assertEqual(analysis["analysis"]["Dataset 2"]["relevance"], "Medium")
         
         self.assertIn("Dataset 1 is the best choice", analysis["overall_recommendation"])
+    
+    def test_search_terms_cache_normalizes_query(self):
+        """Test that queries differing only in case or whitespace share a cached response."""
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        with patch('agents.llm_agent.cache', Cache(cache_dir)), patch('agents.llm_agent.config.DEBUG', False):
+            first = self.agent._generate_search_terms("Find datasets for machine learning")
+            second = self.agent._generate_search_terms("  find DATASETS for\nmachine learning ")
+        
+        self.assertEqual(first, second)
+        self.mock_client.return_value.chat.completions.create.assert_awaited_once()
+    
+    def test_llm_cache_ttl(self):
+        """Test that sampled LLM responses are reused until the LLM cache TTL expires."""
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        create = self.mock_client.return_value.chat.completions.create
+        self.assertGreater(self.agent.llm_config.temperature, 0)
+        
+        with patch('agents.llm_agent.cache', Cache(cache_dir)), patch('agents.llm_agent.config.DEBUG', False):
+            self.agent._generate_search_terms("Find datasets for machine learning")
+            
+            # Still cached after the default expiry, but not after the TTL
+            with patch('utils.cache.time.time', return_value=time.time() + self.agent.LLM_CACHE_TTL - 60):
+                self.agent._generate_search_terms("Find datasets for machine learning")
+            self.assertEqual(create.await_count, 1)
+            
+            with patch('utils.cache.time.time', return_value=time.time() + self.agent.LLM_CACHE_TTL + 1):
+                self.agent._generate_search_terms("Find datasets for machine learning")
+            self.assertEqual(create.await_count, 2)
+    
+    def test_close(self):
+        """Test closing the agent."""
+        # Start the event loop, then close the agent
+        self.agent._generate_search_terms("Find datasets for machine learning")
+        self.agent.close()
+        
+        # Check the client was closed and the agent refuses further work
+        self.mock_client.return_value.close.assert_awaited_once()
+        with self.assertRaises(RuntimeError):
+            self.agent._generate_search_terms("Find datasets for machine learning")
+    
+    def test_close_waits_for_searches(self):
+        """Test that closing the agent lets searches in progress finish first."""
+        create = self.mock_client.return_value.chat.completions.create
+        response = create.return_value
+        started = threading.Event()
+        release = threading.Event()
+        
+        async def slow_create(**kwargs):
+            started.set()
+            await asyncio.to_thread(release.wait, 5)
+            return response
+        create.side_effect = slow_create
+        
+        results = []
+        search = threading.Thread(
+            target=lambda: results.append(self.agent._generate_search_terms("Find datasets for machine learning"))
+        )
+        search.start()
+        self.assertTrue(started.wait(5))
+        
+        # The search is still running, so the client stays open
+        self.agent.close()
+        self.mock_client.return_value.close.assert_not_awaited()
+        
+        # The agent is closed once the search returns
+        release.set()
+        search.join(5)
+        self.assertEqual(len(results[0][0]), 3)
+        self.mock_client.return_value.close.assert_awaited_once()
 
 if __name__ == "__main__":
     unittest.main()
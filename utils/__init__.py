@@ -1,8 +1,8 @@
 """
 Utility modules for the SearchableDataset application.
 """
-from .config import config
+from .config import config, LLMConfig
 from .logger import logger, setup_logger
 from .cache import cache, Cache
 
-__all__ = ["config", "logger", "setup_logger", "cache", "Cache"]
+__all__ = ["config", "LLMConfig", "logger", "setup_logger", "cache", "Cache"]
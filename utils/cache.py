@@ -3,29 +3,127 @@ Caching utilities for the SearchableDataset application.
 """
 import time
 import json
+import hashlib
 import os
 import pickle
-from typing import Any, Dict, Optional, Callable, TypeVar, cast
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Callable, Tuple, TypeVar, cast
 from functools import wraps
 from .logger import logger
 from .config import config
 
+# orjson reads and writes the JSON cache files faster; json is the fallback
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
 # Type variable for generic function
 T = TypeVar('T')
 
+# Number of entries kept in memory in front of the cache files
+MEMORY_CACHE_SIZE = 1024
+
+# Number of argument combinations per cached function whose cache keys are remembered
+KEY_MEMO_SIZE = 512
+
+# Extension of the cache files, which hold either JSON or a pickle
+CACHE_EXTENSION = ".cache"
+
+def _is_json_value(value: Any) -> bool:
+    """
+    Check whether a value round-trips through JSON unchanged.
+    
+    Args:
+        value: Value to check.
+        
+    Returns:
+        bool: True if the value is made of JSON types only.
+    """
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return True
+    if isinstance(value, list):
+        return all(_is_json_value(item) for item in value)
+    if isinstance(value, dict):
+        return all(isinstance(k, str) and _is_json_value(v) for k, v in value.items())
+    return False
+
+class _Call:
+    """A cached function call in progress, which concurrent identical calls wait on."""
+    
+    def __init__(self):
+        """Initialize the call."""
+        self.done = threading.Event()
+        self.result: Any = None
+
+def normalize_prompt(text: str) -> str:
+    """
+    Normalize a prompt for cache lookups, ignoring case and whitespace differences.
+    
+    Args:
+        text: Prompt text.
+        
+    Returns:
+        str: Lowercased text with runs of whitespace collapsed to single spaces.
+    """
+    return " ".join(text.lower().split())
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    """
+    Serialize a cache entry, as JSON if its value allows it and as a pickle otherwise.
+    
+    Args:
+        data: Cache entry with "timestamp" and "value" keys.
+        
+    Returns:
+        bytes: Serialized entry.
+    """
+    if _is_json_value(data["value"]):
+        encoded = _json.dumps(data)
+        return encoded.encode("utf-8") if isinstance(encoded, str) else encoded
+    
+    # Objects such as DatasetInfo have to come back as themselves
+    return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _loads(raw: bytes) -> Dict[str, Any]:
+    """
+    Deserialize a cache entry written by _dumps.
+    
+    Args:
+        raw: Serialized entry.
+        
+    Returns:
+        Dict[str, Any]: Cache entry with "timestamp" and "value" keys.
+    """
+    # A JSON entry is an object; a pickle starts with its protocol opcode instead
+    if raw[:1] == b"{":
+        return _json.loads(raw)
+    return pickle.loads(raw)
+
 class Cache:
     """Simple cache implementation for storing function results."""
     
-    def __init__(self, cache_dir: str = ".cache"):
+    def __init__(self, cache_dir: str = ".cache", memory_size: int = MEMORY_CACHE_SIZE):
         """
         Initialize the cache.
         
         Args:
             cache_dir: Directory to store cache files.
+            memory_size: Number of recently used entries to keep in memory.
         """
         self.cache_dir = cache_dir
         self.expiry = config.CACHE_EXPIRY
         
+        # Recently used entries as (expiry time, value), so hot keys skip the cache files.
+        # The downloader's threads share the cache, hence the lock
+        self._mem: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._mem_size = memory_size
+        self._lock = threading.RLock()
+        
+        # Calls in progress by cache key, so concurrent identical calls share one result
+        self._calls: Dict[str, _Call] = {}
+        
         # Create cache directory if it doesn't exist
         if not os.path.exists(cache_dir):
             os.makedirs(cache_dir)
@@ -42,15 +140,18 @@ class Cache:
         Returns:
             str: Cache key.
         """
-        # Convert args and kwargs to a string representation
-        args_str = json.dumps(str(args))
-        kwargs_str = json.dumps(str(kwargs), sort_keys=True)
-        
-        # Combine function name and arguments to create a unique key
-        key = f"{func_name}_{args_str}_{kwargs_str}"
+        # Serialize the call canonically; objects JSON cannot encode, such as the
+        # connector, fall back to their repr
+        payload = json.dumps(
+            {"f": func_name, "a": args, "k": kwargs},
+            sort_keys=True,
+            default=repr,
+            separators=(",", ":"),
+        ).encode("utf-8")
         
-        # Use a hash of the key as the filename to avoid issues with long filenames
-        return f"{hash(key)}"
+        # Use a content hash as the filename, which unlike hash() is the same in every
+        # process, so cache files are still hit after a restart
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
     
     def _get_cache_path(self, key: str) -> str:
         """
@@ -62,7 +163,7 @@ class Cache:
         Returns:
             str: File path.
         """
-        return os.path.join(self.cache_dir, f"{key}.pkl")
+        return os.path.join(self.cache_dir, f"{key}{CACHE_EXTENSION}")
     
     def get(self, key: str) -> Optional[Dict[str, Any]]:
         """
@@ -74,6 +175,19 @@ class Cache:
         Returns:
             Optional[Dict[str, Any]]: Cached value or None if not found or expired.
         """
+        # Check the in-memory entries first
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                if time.time() > entry[0]:
+                    logger.debug("Cache expired for key: %s", key)
+                    del self._mem[key]
+                    return None
+                
+                self._mem.move_to_end(key)
+                logger.debug("Cache hit for key: %s", key)
+                return entry[1]
+        
         cache_path = self._get_cache_path(key)
         
         if not os.path.exists(cache_path):
@@ -81,41 +195,72 @@ class Cache:
         
         try:
             with open(cache_path, "rb") as f:
-                cached_data = pickle.load(f)
+                cached_data = _loads(f.read())
             
             # Check if cache has expired
-            if time.time() - cached_data["timestamp"] > self.expiry:
-                logger.debug(f"Cache expired for key: {key}")
+            expires = cached_data["timestamp"] + cached_data.get("ttl", self.expiry)
+            if time.time() > expires:
+                logger.debug("Cache expired for key: %s", key)
                 return None
             
-            logger.debug(f"Cache hit for key: {key}")
+            self._remember(key, expires, cached_data["value"])
+            
+            logger.debug("Cache hit for key: %s", key)
             return cached_data["value"]
         except Exception as e:
-            logger.error(f"Error reading cache: {e}")
+            logger.error("Error reading cache: %s", e)
             return None
     
-    def set(self, key: str, value: Any) -> None:
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
         """
         Set a value in the cache.
         
         Args:
             key: Cache key.
             value: Value to cache.
+            ttl: Seconds the value is kept. Defaults to the cache's expiry.
         """
         cache_path = self._get_cache_path(key)
+        # Write to a file of this thread's own and rename it into place, so readers
+        # never see a partly written entry
+        temp_path = f"{cache_path}.tmp-{os.getpid()}-{threading.get_ident()}"
         
         try:
             cached_data = {
                 "timestamp": time.time(),
                 "value": value,
             }
+            if ttl is not None:
+                cached_data["ttl"] = ttl
             
-            with open(cache_path, "wb") as f:
-                pickle.dump(cached_data, f)
+            self._remember(key, cached_data["timestamp"] + (self.expiry if ttl is None else ttl), value)
             
-            logger.debug(f"Cache set for key: {key}")
+            with open(temp_path, "wb") as f:
+                f.write(_dumps(cached_data))
+            os.replace(temp_path, cache_path)
+            
+            logger.debug("Cache set for key: %s", key)
         except Exception as e:
-            logger.error(f"Error writing cache: {e}")
+            logger.error("Error writing cache: %s", e)
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+    
+    def _remember(self, key: str, expires: float, value: Any) -> None:
+        """
+        Keep an entry in memory, evicting the least recently used entries past the limit.
+        
+        Args:
+            key: Cache key.
+            expires: Time the value expires.
+            value: Cached value.
+        """
+        with self._lock:
+            self._mem[key] = (expires, value)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self._mem_size:
+                self._mem.popitem(last=False)
     
     def clear(self, key: Optional[str] = None) -> None:
         """
@@ -124,15 +269,27 @@ class Cache:
         Args:
             key: Cache key to clear. If None, clear all cache.
         """
+        with self._lock:
+            if key:
+                self._mem.pop(key, None)
+            else:
+                self._mem.clear()
+        
         if key:
-            cache_path = self._get_cache_path(key)
-            if os.path.exists(cache_path):
-                os.remove(cache_path)
-                logger.debug(f"Cleared cache for key: {key}")
+            try:
+                os.unlink(self._get_cache_path(key))
+                logger.debug("Cleared cache for key: %s", key)
+            except FileNotFoundError:
+                pass
         else:
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith(".pkl"):
-                    os.remove(os.path.join(self.cache_dir, filename))
+            # scandir entries carry their path and file type, so no extra stat per file
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(CACHE_EXTENSION) and entry.is_file(follow_symlinks=False):
+                        try:
+                            os.unlink(entry.path)
+                        except FileNotFoundError:
+                            pass
             logger.debug("Cleared all cache")
     
     def cached(self, func: Callable[..., T]) -> Callable[..., T]:
@@ -145,23 +302,61 @@ class Cache:
         Returns:
             Callable: Wrapped function.
         """
+        # Cache keys of recent hashable argument combinations, so repeat calls skip
+        # serializing and hashing the arguments
+        key_memo: Dict[Any, str] = {}
+        
         @wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> T:
             # Skip cache if DEBUG is True
             if config.DEBUG:
                 return func(*args, **kwargs)
             
-            # Generate cache key
-            key = self._get_cache_key(func.__name__, args, kwargs)
+            # Generate cache key, or reuse the one of an earlier call with the same arguments
+            memo_key: Any = (args, tuple(sorted(kwargs.items())))
+            try:
+                key = key_memo.get(memo_key)
+            except TypeError:
+                memo_key = key = None
+            
+            if key is None:
+                key = self._get_cache_key(func.__name__, args, kwargs)
+                if memo_key is not None:
+                    with self._lock:
+                        if len(key_memo) >= KEY_MEMO_SIZE:
+                            key_memo.pop(next(iter(key_memo)))
+                        key_memo[memo_key] = key
             
             # Try to get from cache
             cached_value = self.get(key)
             if cached_value is not None:
                 return cast(T, cached_value)
             
-            # Call function and cache result
-            result = func(*args, **kwargs)
-            self.set(key, result)
+            # Wait for an identical call already in progress, such as the same search
+            # from another session, rather than making the same request again
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+            
+            if not leader:
+                call.done.wait()
+                if call.result is not None:
+                    return cast(T, call.result)
+                
+                # The call failed or found nothing, so make it here instead
+                return func(*args, **kwargs)
+            
+            try:
+                # Call function and cache result
+                result = func(*args, **kwargs)
+                self.set(key, result)
+                call.result = result
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
             
             return result
         
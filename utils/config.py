@@ -2,12 +2,22 @@
 Configuration management for the SearchableDataset application.
 """
 import os
+from dataclasses import dataclass
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+@dataclass(frozen=True, slots=True)
+class LLMConfig:
+    """Configuration for the LLM."""
+    
+    api_key: str
+    model: str
+    temperature: float
+    max_tokens: int
+
 class Config:
     """Configuration class for the application."""
     
@@ -22,20 +32,20 @@ class Config:
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     
     # Parse CACHE_EXPIRY and strip any comments
-    _cache_expiry_value = os.getenv("CACHE_EXPIRY", "3600")
-    if "#" in _cache_expiry_value:
-        _cache_expiry_value = _cache_expiry_value.split("#")[0].strip()
-    CACHE_EXPIRY: int = int(_cache_expiry_value)
+    CACHE_EXPIRY: int = int(os.getenv("CACHE_EXPIRY", "3600").split("#", 1)[0].strip())
+    
+    # Number of worker threads shared by all dataset searches
+    MAX_SEARCH_WORKERS: int = int(os.getenv("MAX_SEARCH_WORKERS", "16"))
     
     @classmethod
-    def get_llm_config(cls) -> Dict[str, Any]:
+    def get_llm_config(cls) -> LLMConfig:
         """Get configuration for the LLM."""
-        return {
-            "api_key": cls.OPENAI_API_KEY,
-            "model": "gpt-4o",  # Default model
-            "temperature": 0.7,
-            "max_tokens": 1000,
-        }
+        return LLMConfig(
+            api_key=cls.OPENAI_API_KEY,
+            model="gpt-4o",  # Default model
+            temperature=0.7,
+            max_tokens=1000,
+        )
     
     @classmethod
     def get_kaggle_config(cls) -> Dict[str, str]:
@@ -2,10 +2,15 @@
 Dataset downloader module for the SearchableDataset application.
 """
 import os
+import re
+import atexit
+import asyncio
 import threading
 import time
-import requests
-from typing import Dict, Any, Optional, Callable, List
+import heapq
+import queue
+import aiohttp
+from typing import Dict, Any, Optional, Callable, List, Tuple, BinaryIO
 from pathlib import Path
 import shutil
 import uuid
@@ -15,6 +20,9 @@ from utils.logger import setup_logger
 # Set up logger
 log = setup_logger("downloader")
 
+# Characters not allowed in dataset filenames: anything but letters, digits, "-", "_" and "."
+_UNSAFE_FILENAME_RE = re.compile(r"[^\w.\-]")
+
 class DownloadStatus:
     """Class representing the status of a download."""
     
@@ -60,13 +68,25 @@ class DownloadTask:
         self.file_path = None
         self.file_size = 0
         self.downloaded_size = 0
-        self.thread = None
+        # Whether the task is waiting for a connector download worker
+        self.queued = False
         self.cancel_event = threading.Event()
 
 
 class DatasetDownloader:
     """Class for downloading datasets."""
     
+    # Maximum number of direct URL downloads, and of connector downloads, running at once;
+    # further downloads wait as pending
+    MAX_CONCURRENT_DOWNLOADS = 8
+    
+    # Size of the chunks read from the response and written to disk; 1 MiB keeps the
+    # number of loop iterations per file low
+    CHUNK_SIZE = 1 << 20
+    
+    # Minimum seconds between progress updates of a direct URL download
+    PROGRESS_INTERVAL = 0.05
+    
     def __init__(self, datasets_dir: str = "Datasets"):
         """
         Initialize the dataset downloader.
@@ -76,12 +96,74 @@ class DatasetDownloader:
         """
         self.datasets_dir = datasets_dir
         self.downloads: Dict[str, DownloadTask] = {}
+        # Guards the downloads dict, which download threads and UI reruns share
+        self._lock = threading.Lock()
+        # Finished downloads as (end_time, task_id), oldest first, for cleanup
+        self._finished: List[Tuple[float, str]] = []
+        
+        # Connector downloads, whose client libraries block, waiting for one of the worker
+        # threads. The workers are daemons, so exiting does not wait for downloads to finish
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._workers: List[threading.Thread] = []
+        
+        # Event loop running direct URL downloads, all sharing one HTTP session. It is
+        # started lazily on a background thread, like the LLM agent's loop.
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._limit: Optional[asyncio.Semaphore] = None
+        atexit.register(self.close)
+        
         self._ensure_datasets_dir()
     
+    def close(self) -> None:
+        """Close the HTTP session and stop the download event loop."""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._session is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(timeout=5)
+            except Exception as e:
+                log.warning("Error closing download session: %s", e)
+        loop.call_soon_threadsafe(loop.stop)
+    
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Get the download event loop, starting it on a background thread if needed.
+        
+        Returns:
+            asyncio.AbstractEventLoop: Running event loop.
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="downloader-loop", daemon=True)
+                thread.start()
+                self._limit = asyncio.Semaphore(self.MAX_CONCURRENT_DOWNLOADS)
+                self._session = None
+                self._loop = loop
+            return self._loop
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Get the shared HTTP session. Must be called on the download event loop.
+        
+        Returns:
+            aiohttp.ClientSession: HTTP session.
+        """
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.MAX_CONCURRENT_DOWNLOADS),
+                timeout=aiohttp.ClientTimeout(sock_connect=30, sock_read=30),
+            )
+        return self._session
+    
     def _ensure_datasets_dir(self) -> None:
         """Ensure the datasets directory exists."""
         os.makedirs(self.datasets_dir, exist_ok=True)
-        log.info(f"Datasets directory: {self.datasets_dir}")
+        log.info("Datasets directory: %s", self.datasets_dir)
     
     def download(
         self,
@@ -116,22 +198,42 @@ class DatasetDownloader:
         )
         
         # Store the task
-        self.downloads[task.id] = task
+        with self._lock:
+            self.downloads[task.id] = task
         
-        # Start the download in a separate thread
-        task.thread = threading.Thread(
-            target=self._download_thread,
-            args=(task, connector_download_func),
-            daemon=True,
-        )
-        task.thread.start()
+        if connector_download_func:
+            # Connector downloads are synchronous, so run them on the worker threads; the
+            # task stays pending until a worker is free
+            task.queued = True
+            self._queue.put((task, connector_download_func))
+            with self._lock:
+                if len(self._workers) < self.MAX_CONCURRENT_DOWNLOADS:
+                    worker = threading.Thread(target=self._worker, name="downloader", daemon=True)
+                    self._workers.append(worker)
+                    worker.start()
+        else:
+            # Direct URL downloads share the download event loop
+            asyncio.run_coroutine_threadsafe(self._adownload(task), self._get_loop())
         
         return task.id
     
+    def _worker(self) -> None:
+        """Run queued connector downloads, one at a time."""
+        while True:
+            task, connector_download_func = self._queue.get()
+            
+            # Downloads cancelled while queued have already been marked as cancelled
+            with self._lock:
+                if not task.queued:
+                    continue
+                task.queued = False
+            
+            self._download_thread(task, connector_download_func)
+    
     def _download_thread(
         self,
         task: DownloadTask,
-        connector_download_func: Optional[Callable] = None,
+        connector_download_func: Callable,
     ) -> None:
         """
         Download thread function.
@@ -140,90 +242,173 @@ class DatasetDownloader:
             task: Download task.
             connector_download_func: Function to download the dataset using the connector.
         """
-        task.start_time = time.time()
-        task.status = DownloadStatus.DOWNLOADING
-        
         try:
-            # Ensure the target directory exists
-            self._ensure_datasets_dir()
+            self._start_task(task)
             
-            # Generate a safe filename
-            safe_name = self._safe_filename(task.dataset_name)
-            
-            # Determine file extension from URL or use default
-            file_ext = self._get_file_extension(task.url)
-            
-            # Create the target file path
-            task.file_path = os.path.join(
-                self.datasets_dir,
-                f"{safe_name}_{task.dataset_id.replace('/', '_')}{file_ext}"
+            # Use the connector's download function
+            connector_download_func(
+                task.dataset_id,
+                task.file_path,
+                lambda progress: self._update_progress(task.id, progress),
+                task.cancel_event,
             )
             
-            # Download the dataset
-            if connector_download_func:
-                # Use the connector's download function
-                connector_download_func(
-                    task.dataset_id,
-                    task.file_path,
-                    lambda progress: self._update_progress(task.id, progress),
-                    task.cancel_event,
-                )
-            else:
-                # Use direct download from URL
-                self._download_from_url(task)
-            
-            # Check if the download was cancelled
-            if task.cancel_event.is_set():
-                task.status = DownloadStatus.CANCELLED
-                # Clean up partial download
-                if os.path.exists(task.file_path):
-                    os.remove(task.file_path)
-                log.info(f"Download cancelled: {task.dataset_name}")
-            else:
-                task.status = DownloadStatus.COMPLETED
-                task.progress = 1.0
-                log.info(f"Download completed: {task.dataset_name} -> {task.file_path}")
-        
+            self._finish_task(task)
         except Exception as e:
-            task.status = DownloadStatus.FAILED
-            task.error = str(e)
-            log.error(f"Download failed: {task.dataset_name} - {e}")
+            self._fail_task(task, e)
+        finally:
+            self._end_task(task)
+    
+    async def _adownload(self, task: DownloadTask) -> None:
+        """
+        Download a dataset directly from its URL on the download event loop.
+        
+        Args:
+            task: Download task.
+        """
+        # Wait for a free download slot; the task stays pending until then
+        async with self._limit:
+            try:
+                self._start_task(task)
+                await self._adownload_from_url(task)
+                self._finish_task(task)
+            except Exception as e:
+                self._fail_task(task, e)
+            finally:
+                self._end_task(task)
+    
+    def _start_task(self, task: DownloadTask) -> None:
+        """
+        Mark a download task as started and choose its target file.
+        
+        Args:
+            task: Download task.
+        """
+        task.start_time = time.time()
+        task.status = DownloadStatus.DOWNLOADING
+        
+        # Generate a safe filename
+        safe_name = self._safe_filename(task.dataset_name)
+        
+        # Determine file extension from URL or use default
+        file_ext = self._get_file_extension(task.url)
+        
+        # Create the target file path
+        task.file_path = os.path.join(
+            self.datasets_dir,
+            f"{safe_name}_{task.dataset_id.replace('/', '_')}{file_ext}"
+        )
+    
+    def _end_task(self, task: DownloadTask) -> None:
+        """
+        Record when a download task ended, so it can be cleaned up once old enough.
+        
+        Args:
+            task: Download task.
+        """
+        task.end_time = time.time()
+        with self._lock:
+            heapq.heappush(self._finished, (task.end_time, task.id))
+    
+    @staticmethod
+    def _finish_task(task: DownloadTask) -> None:
+        """
+        Mark a download task as completed, or as cancelled if it was cancelled.
+        
+        Args:
+            task: Download task.
+        """
+        # Check if the download was cancelled
+        if task.cancel_event.is_set():
+            task.status = DownloadStatus.CANCELLED
             # Clean up partial download
-            if task.file_path and os.path.exists(task.file_path):
+            if os.path.exists(task.file_path):
                 os.remove(task.file_path)
+            log.info("Download cancelled: %s", task.dataset_name)
+        else:
+            task.status = DownloadStatus.COMPLETED
+            task.progress = 1.0
+            log.info("Download completed: %s -> %s", task.dataset_name, task.file_path)
+    
+    @staticmethod
+    def _fail_task(task: DownloadTask, error: Exception) -> None:
+        """
+        Mark a download task as failed.
         
-        finally:
-            task.end_time = time.time()
+        Args:
+            task: Download task.
+            error: Error that stopped the download.
+        """
+        task.status = DownloadStatus.FAILED
+        task.error = str(error)
+        log.error("Download failed: %s - %s", task.dataset_name, error)
+        # Clean up partial download
+        if task.file_path and os.path.exists(task.file_path):
+            os.remove(task.file_path)
     
-    def _download_from_url(self, task: DownloadTask) -> None:
+    @staticmethod
+    def _preallocate(f: BinaryIO, size: int) -> None:
+        """
+        Reserve disk space for a file, where the filesystem supports it.
+        
+        Args:
+            f: File opened for writing.
+            size: Number of bytes to reserve.
+        """
+        try:
+            os.posix_fallocate(f.fileno(), 0, size)
+        except OSError:
+            pass
+    
+    async def _adownload_from_url(self, task: DownloadTask) -> None:
         """
         Download a file from a URL.
         
         Args:
             task: Download task.
         """
-        with requests.get(task.url, stream=True, timeout=30) as response:
+        async with self._get_session().get(task.url) as response:
             response.raise_for_status()
             
             # Get the file size if available
-            if 'content-length' in response.headers:
-                task.file_size = int(response.headers['content-length'])
+            if response.content_length:
+                task.file_size = response.content_length
             
-            # Download the file
-            with open(task.file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
+            # Download the file. The file is opened, written and closed on worker threads,
+            # so a slow disk does not hold up the other downloads sharing the loop
+            last_update = 0.0
+            f = await asyncio.to_thread(open, task.file_path, 'wb')
+            try:
+                # Reserve the file's blocks up front so the filesystem can lay them out
+                # contiguously. Without native support it is emulated block by block, so
+                # it runs on a worker thread like the writes
+                if task.file_size > 0 and hasattr(os, "posix_fallocate"):
+                    await asyncio.to_thread(self._preallocate, f, task.file_size)
+                
+                async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
                     # Check if download should be cancelled
                     if task.cancel_event.is_set():
                         return
                     
-                    if chunk:
-                        f.write(chunk)
-                        task.downloaded_size += len(chunk)
-                        
-                        # Update progress
-                        if task.file_size > 0:
+                    await asyncio.to_thread(f.write, chunk)
+                    task.downloaded_size += len(chunk)
+                    
+                    # Update progress, at most every PROGRESS_INTERVAL seconds
+                    if task.file_size > 0:
+                        now = time.monotonic()
+                        if now - last_update >= self.PROGRESS_INTERVAL:
+                            last_update = now
                             progress = task.downloaded_size / task.file_size
                             self._update_progress(task.id, progress)
+                
+                # Drop any reserved space the body did not fill
+                await asyncio.to_thread(f.truncate, task.downloaded_size)
+            finally:
+                await asyncio.to_thread(f.close)
+            
+            # Report the final progress the throttle may have skipped
+            if task.file_size > 0:
+                self._update_progress(task.id, task.downloaded_size / task.file_size)
     
     def _update_progress(self, task_id: str, progress: float) -> None:
         """
@@ -233,8 +418,9 @@ class DatasetDownloader:
             task_id: Download task ID.
             progress: Progress value (0.0 to 1.0).
         """
-        if task_id in self.downloads:
-            self.downloads[task_id].progress = min(max(progress, 0.0), 1.0)
+        task = self.downloads.get(task_id)
+        if task is not None:
+            task.progress = min(max(progress, 0.0), 1.0)
     
     def cancel_download(self, task_id: str) -> bool:
         """
@@ -246,15 +432,22 @@ class DatasetDownloader:
         Returns:
             bool: True if the download was cancelled, False otherwise.
         """
-        if task_id in self.downloads:
-            task = self.downloads[task_id]
-            
-            # Only cancel if the download is pending or in progress
-            if task.status in [DownloadStatus.PENDING, DownloadStatus.DOWNLOADING]:
-                task.cancel_event.set()
-                return True
+        task = self.downloads.get(task_id)
+        
+        # Only cancel if the download is pending or in progress
+        if task is None or task.status not in (DownloadStatus.PENDING, DownloadStatus.DOWNLOADING):
+            return False
+        
+        task.cancel_event.set()
+        
+        # A connector download still waiting for a worker never starts
+        with self._lock:
+            was_queued, task.queued = task.queued, False
+        if was_queued:
+            task.status = DownloadStatus.CANCELLED
+            self._end_task(task)
         
-        return False
+        return True
     
     def get_download_status(self, task_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -266,42 +459,70 @@ class DatasetDownloader:
         Returns:
             Optional[Dict[str, Any]]: Download status or None if not found.
         """
-        if task_id in self.downloads:
-            task = self.downloads[task_id]
+        with self._lock:
+            task = self.downloads.get(task_id)
+        
+        return None if task is None else self._status(task)
+    
+    def get_download_statuses(self, task_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Get the statuses of several downloads at once.
+        
+        Args:
+            task_ids: Download task IDs.
             
-            # Calculate download speed and ETA
-            speed = 0.0
-            eta = 0.0
+        Returns:
+            Dict[str, Optional[Dict[str, Any]]]: Download status for each ID, or None if not found.
+        """
+        with self._lock:
+            tasks = [(task_id, self.downloads.get(task_id)) for task_id in task_ids]
+        
+        now = time.time()
+        return {task_id: None if task is None else self._status(task, now) for task_id, task in tasks}
+    
+    @staticmethod
+    def _status(task: DownloadTask, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Build the status of a download task.
+        
+        Args:
+            task: Download task.
+            now: Current time, so statuses built together share one clock reading.
             
-            if (task.status == DownloadStatus.DOWNLOADING and 
-                task.start_time and task.file_size > 0 and 
-                task.downloaded_size > 0):
-                
-                elapsed = time.time() - task.start_time
-                if elapsed > 0:
-                    speed = task.downloaded_size / elapsed  # bytes per second
-                    remaining_bytes = task.file_size - task.downloaded_size
-                    if speed > 0:
-                        eta = remaining_bytes / speed  # seconds
+        Returns:
+            Dict[str, Any]: Download status.
+        """
+        # Calculate download speed and ETA
+        speed = 0.0
+        eta = 0.0
+        
+        if (task.status == DownloadStatus.DOWNLOADING and 
+            task.start_time and task.file_size > 0 and 
+            task.downloaded_size > 0):
             
-            return {
-                "id": task.id,
-                "dataset_id": task.dataset_id,
-                "dataset_name": task.dataset_name,
-                "source": task.source,
-                "status": task.status,
-                "progress": task.progress,
-                "error": task.error,
-                "file_path": task.file_path,
-                "file_size": task.file_size,
-                "downloaded_size": task.downloaded_size,
-                "speed": speed,  # bytes per second
-                "eta": eta,  # seconds
-                "start_time": task.start_time,
-                "end_time": task.end_time,
-            }
-        
-        return None
+            elapsed = (now or time.time()) - task.start_time
+            if elapsed > 0:
+                speed = task.downloaded_size / elapsed  # bytes per second
+                remaining_bytes = task.file_size - task.downloaded_size
+                if speed > 0:
+                    eta = remaining_bytes / speed  # seconds
+        
+        return {
+            "id": task.id,
+            "dataset_id": task.dataset_id,
+            "dataset_name": task.dataset_name,
+            "source": task.source,
+            "status": task.status,
+            "progress": task.progress,
+            "error": task.error,
+            "file_path": task.file_path,
+            "file_size": task.file_size,
+            "downloaded_size": task.downloaded_size,
+            "speed": speed,  # bytes per second
+            "eta": eta,  # seconds
+            "start_time": task.start_time,
+            "end_time": task.end_time,
+        }
     
     def get_all_downloads(self) -> List[Dict[str, Any]]:
         """
@@ -310,11 +531,11 @@ class DatasetDownloader:
         Returns:
             List[Dict[str, Any]]: List of download statuses.
         """
-        return [
-            self.get_download_status(task_id) 
-            for task_id in self.downloads
-            if self.get_download_status(task_id) is not None
-        ]
+        with self._lock:
+            tasks = list(self.downloads.values())
+        
+        now = time.time()
+        return [self._status(task, now) for task in tasks]
     
     def clean_completed_downloads(self, max_age: int = 3600) -> int:
         """
@@ -327,17 +548,16 @@ class DatasetDownloader:
             int: Number of downloads cleaned up.
         """
         now = time.time()
-        to_remove = []
-        
-        for task_id, task in self.downloads.items():
-            if (task.status in [DownloadStatus.COMPLETED, DownloadStatus.FAILED, DownloadStatus.CANCELLED] and
-                task.end_time and now - task.end_time > max_age):
-                to_remove.append(task_id)
+        removed = 0
         
-        for task_id in to_remove:
-            del self.downloads[task_id]
+        # Finished downloads come off the heap oldest first, so only the expired ones are visited
+        with self._lock:
+            while self._finished and now - self._finished[0][0] > max_age:
+                _, task_id = heapq.heappop(self._finished)
+                if self.downloads.pop(task_id, None) is not None:
+                    removed += 1
         
-        return len(to_remove)
+        return removed
     
     @staticmethod
     def _safe_filename(filename: str) -> str:
@@ -351,7 +571,7 @@ class DatasetDownloader:
             str: Safe filename.
         """
         # Replace invalid characters
-        safe_name = "".join(c if c.isalnum() or c in ['-', '_', '.'] else '_' for c in filename)
+        safe_name = _UNSAFE_FILENAME_RE.sub("_", filename)
         
         # Limit length
         if len(safe_name) > 100:
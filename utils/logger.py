@@ -3,6 +3,7 @@ Logging configuration for the SearchableDataset application.
 """
 import logging
 import sys
+import functools
 from typing import Optional
 from .config import config
 
@@ -15,10 +16,13 @@ LOG_LEVELS = {
     "CRITICAL": logging.CRITICAL,
 }
 
+@functools.lru_cache(maxsize=None)
 def setup_logger(name: str, level: Optional[str] = None) -> logging.Logger:
     """
     Set up a logger with the specified name and level.
     
+    Each logger is set up once; later calls with the same arguments return it as is.
+    
     Args:
         name: The name of the logger.
         level: The log level. If None, the level from the config is used.